@@ -1,7 +1,15 @@
 # Homepage.py — USDA Food Dashboard (fixed bars = no aggregation)
 import streamlit as st
+from session_memory import track, memory_panel
 import pandas as pd
 import altair as alt
+from store import get_store
+from stats_cube import get_cube
+from lazy import lazy_import
+
+# SciPy and the KD-tree are only needed once someone asks for similar foods
+similarity = lazy_import("similarity")
+
 # from common import (
 #     set_page_config,
 #     apply_custom_styles,
@@ -20,6 +28,8 @@ import altair as alt
 
 
 st.set_page_config(page_title="🍽️ USDA Food Dashboard", layout="wide")
+track()
+memory_panel()
 # theme_heading("🍽️ USDA Food Nutrient Dashboard", level=1)
 # theme_heading("🥩 Top Protein Foods (per 100 g)", level=3)
 
@@ -35,53 +45,29 @@ def enable_theme_for_charts():
 
 # ----------------- Load USDA dataset -----------------
 
-
-DATA_URL = "https://drive.google.com/uc?export=download&id=1SjGNAij9o5q4V_62qfMkcjFegQvj5Ij2"
-
-@st.cache_data
-def load_data():
-    df = pd.read_csv(DATA_URL)
-    # Convert key nutrient columns to numeric
-    for c in ["Calories (kcal)", "Protein (g)", "Carbs (g)", "Fat (g)", "Fiber (g)", "Sugar (g)"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df
-
-df = load_data()
+store = get_store()
+cube = get_cube(store)
 
 # ----------------- Sidebar Filters -----------------
 st.sidebar.header("🔍 Filters")
 
-categories = sorted(df["Category"].dropna().unique())
-
+categories = store.categories()
 
-#categories = sorted(df["Category"].dropna().unique())
 selected_category = st.sidebar.selectbox("Select Category", ["All"] + categories)
 search_term = st.sidebar.text_input("Search Food by Name")
 top_n = st.sidebar.slider("Show Top N", 5, 30, 10)
 
-# Filter dataframe
-filtered = df.copy()
-if selected_category != "All":
-    filtered = filtered[filtered["Category"] == selected_category]
-if search_term:
-    filtered = filtered[filtered["Food"].str.contains(search_term, case=False, na=False)]
+# Filters are pushed down into the catalog store queries
+category_filter = None if selected_category == "All" else selected_category
 
 # ----------------- Helpers -----------------
-palette = alt.Scale(scheme="category20")
-
-def prep_top(data: pd.DataFrame, nutrient: str, k: int) -> pd.DataFrame:
-    """Make sure we have exactly one row per food for the chart."""
-    d = data.copy()
-    d = d.dropna(subset=[nutrient])
-    # If a food appears multiple times, keep the row with the highest nutrient value
-    d = (
-        d.sort_values([ "Food", nutrient ], ascending=[ True, False ])
-         .drop_duplicates(subset="Food", keep="first")
-         .sort_values(nutrient, ascending=False)
-         .head(k)
-    )
-    return d
+PALETTE = "category20"
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def prep_top(version: str, nutrient: str, k: int, category, term) -> pd.DataFrame:
+    """Exactly one row per food for the chart (deduplicated in the store query).
+    Cached on the catalog version + filters, so only rankings whose inputs changed query the store."""
+    return store.top(nutrient, k, category=category, term=term)
 
 def make_chart(data: pd.DataFrame, nutrient: str, title: str):
     # Domain to avoid autosum illusions and keep axis tidy
@@ -95,7 +81,7 @@ def make_chart(data: pd.DataFrame, nutrient: str, title: str):
                     scale=alt.Scale(domain=[0, xmax * 1.05]),
                     axis=alt.Axis(labelAngle=0)),
             y=alt.Y("Food:N", sort="-x", axis=alt.Axis(labelLimit=650, title=None)),
-            color=alt.Color("Category:N", scale=palette,
+            color=alt.Color("Category:N", scale=alt.Scale(scheme=PALETTE),
                             legend=alt.Legend(title="Category", orient="right")),
             tooltip=[
                 alt.Tooltip("Food:N", title="Food"),
@@ -108,41 +94,109 @@ def make_chart(data: pd.DataFrame, nutrient: str, title: str):
     )
     return chart
 
+def similar_panel(top: pd.DataFrame, key: str):
+    """'Foods like this' panel under a ranking table, built only when switched on."""
+    if top.empty:
+        return
+    if st.toggle("🔎 Foods like these", key=f"sim_on_{key}"):
+        food_index = similarity.get_index(store)
+        c1, c2, c3 = st.columns([2, 1, 1])
+        pos = c1.selectbox("Food", options=top.index.tolist(),
+                           format_func=lambda i: top.at[i, "Food"], key=f"sim_food_{key}")
+        k = c2.number_input("How many", 1, 20, 5, key=f"sim_k_{key}")
+        same_cat = c3.checkbox("Same category", key=f"sim_cat_{key}")
+        cats = [top.at[pos, "Category"]] if same_cat else None
+        st.dataframe(food_index.similar_frame(pos, k, categories=cats),
+                     use_container_width=True)
+
 # ----------------- Main Dashboard -----------------
 st.title("🍽️ USDA Food Nutrient Dashboard")
 
+# Each section is a fragment: its own widgets rerun only that section, and its
+# inputs (filters from the sidebar) are passed in explicitly.
+@st.fragment
+def ranking(nutrient: str, heading: str, title: str, key: str, k: int, category, term):
+    top = prep_top(store.version, nutrient, k, category, term)
+    st.subheader(heading)
+    if not top.empty:
+        st.altair_chart(make_chart(top, nutrient, title), use_container_width=True)
+    st.caption("📌 All nutrient values are expressed per 100 g of food.")
+    st.dataframe(top, use_container_width=True)
+    similar_panel(top, key)
+
 # Top Protein
-top_protein = prep_top(filtered, "Protein (g)", top_n)
-st.subheader("🥩 Top Protein Foods (per 100 g)")
-st.altair_chart(make_chart(top_protein, "Protein (g)", "Top Protein Foods"), use_container_width=True)
-st.caption("📌 All nutrient values are expressed per 100 g of food.")
-st.dataframe(top_protein, use_container_width=True)
+ranking("Protein (g)", "🥩 Top Protein Foods (per 100 g)", "Top Protein Foods", "protein",
+        top_n, category_filter, search_term)
 
 # Top Fiber
-top_fiber = prep_top(filtered, "Fiber (g)", top_n)
-st.subheader("🌾 Top Fiber Foods (per 100 g)")
-st.altair_chart(make_chart(top_fiber, "Fiber (g)", "Top Fiber Foods"), use_container_width=True)
-st.caption("📌 All nutrient values are expressed per 100 g of food.")
-st.dataframe(top_fiber, use_container_width=True)
+ranking("Fiber (g)", "🌾 Top Fiber Foods (per 100 g)", "Top Fiber Foods", "fiber",
+        top_n, category_filter, search_term)
 
 # Top Sugar & Fat (tabs)
 tab1, tab2 = st.tabs(["🍭 Top Sugary Foods", "🍟 Top Fatty Foods"])
 
 with tab1:
-    top_sugar = prep_top(filtered, "Sugar (g)", top_n)
-    st.subheader("🍭 Top Sugary Foods (per 100 g)")
-    st.altair_chart(make_chart(top_sugar, "Sugar (g)", "Top Sugary Foods"), use_container_width=True)
-    st.caption("📌 All nutrient values are expressed per 100 g of food.")
-    st.dataframe(top_sugar, use_container_width=True)
+    ranking("Sugar (g)", "🍭 Top Sugary Foods (per 100 g)", "Top Sugary Foods", "sugar",
+            top_n, category_filter, search_term)
 
 with tab2:
-    top_fat = prep_top(filtered, "Fat (g)", top_n)
-    st.subheader("🍟 Top Fatty Foods (per 100 g)")
-    st.altair_chart(make_chart(top_fat, "Fat (g)", "Top Fatty Foods"), use_container_width=True)
-    st.caption("📌 All nutrient values are expressed per 100 g of food.")
-    st.dataframe(top_fat, use_container_width=True)
+    ranking("Fat (g)", "🍟 Top Fatty Foods (per 100 g)", "Top Fatty Foods", "fat",
+            top_n, category_filter, search_term)
+
+# ----------------- Distributions (precomputed stats cube) -----------------
+@st.fragment
+def distributions(category):
+    st.subheader("📊 Nutrient Distributions by Category")
+    st.caption("📌 Precomputed per category — merged on the fly for the categories you pick.")
+
+    cd1, cd2 = st.columns([2, 1])
+    dist_cats = cd1.multiselect("Categories (empty = all)", cube.categories,
+                                default=[category] if category else [])
+    dist_measure = cd2.selectbox("Measure", cube.measures,
+                                 index=cube.measures.index("Protein density (g/100 kcal)"))
+
+    merged = cube.merged(dist_measure, dist_cats)
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Foods", f"{merged['count']:,}")
+    m2.metric("Mean", f"{merged['mean']:.2f}")
+    m3.metric("Median", f"{merged['quantiles'][0.5]:.2f}")
+    m4.metric("P25 – P75", f"{merged['quantiles'][0.25]:.1f} – {merged['quantiles'][0.75]:.1f}")
+
+    hist_chart = (
+        alt.Chart(merged["hist"])
+        .mark_bar()
+        .encode(
+            x=alt.X("Start:Q", bin="binned", title=dist_measure),
+            x2="End:Q",
+            y=alt.Y("Count:Q", title="Foods"),
+            tooltip=[alt.Tooltip("Start:Q", format=".1f"), alt.Tooltip("End:Q", format=".1f"), "Count:Q"],
+        )
+        .properties(title=f"Distribution of {dist_measure}", height=300)
+    )
+    st.altair_chart(hist_chart, use_container_width=True)
+
+    summary = cube.summary(dist_measure, dist_cats)
+    median_chart = (
+        alt.Chart(summary)
+        .mark_rule()
+        .encode(
+            y=alt.Y("Category:N", sort="-x", axis=alt.Axis(labelLimit=650, title=None)),
+            x=alt.X("P25:Q", title=f"{dist_measure} (P25 – median – P75)"),
+            x2="P75:Q",
+        )
+        + alt.Chart(summary).mark_point(filled=True, size=60).encode(
+            y=alt.Y("Category:N", sort="-x"),
+            x="P50:Q",
+            color=alt.Color("Category:N", scale=alt.Scale(scheme=PALETTE), legend=None),
+            tooltip=["Category:N", "Count:Q", alt.Tooltip("P50:Q", title="Median", format=".2f")],
+        )
+    ).properties(height=max(200, 18 * len(summary)))
+    st.altair_chart(median_chart, use_container_width=True)
+    st.dataframe(summary.round(2), use_container_width=True, hide_index=True)
+
+distributions(category_filter)
 
 # Optional: quick sanity note if anything looks impossible
-if (df["Protein (g)"] > 120).any():
+if store.max("Protein (g)") > 120:
     st.info("ℹ️ Charts now de-duplicate by food name to prevent sums; "
             "if you still see extreme values, they come from the source CSV.")
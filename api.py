@@ -0,0 +1,248 @@
+# api.py — headless JSON API over the catalog store & nutrition helpers
+# Run:  uvicorn api:app --workers 4
+import hashlib
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
+
+from catalog import DIETS, NUTRIENT_COLS
+from nutrition import (
+    ACTIVITY_LEVELS, calculate_bmr, activity_multiplier, macro_targets,
+    scale_plan, plan_totals
+)
+from similarity import build_index
+from store import open_store
+
+CATALOG_MAX_AGE = 3600
+
+app = FastAPI(title="Nutrition API")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+# -----------------------------------------------------
+# SHARED RESOURCES (one per worker process)
+# -----------------------------------------------------
+_store_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _open_store():
+    return open_store()
+
+
+def get_store():
+    # sync endpoints run in a threadpool; only one thread may build the store
+    with _store_lock:
+        try:
+            return _open_store()
+        except ValueError as e:
+            # e.g. a catalog source without fdc_id — not the client's fault, and retried next request
+            raise HTTPException(503, str(e))
+
+
+@lru_cache(maxsize=4)
+def _index_for(version: str):
+    return build_index(get_store())
+
+
+def get_index():
+    return _index_for(get_store().version)
+
+
+# -----------------------------------------------------
+# RESPONSE HELPERS
+# -----------------------------------------------------
+def _records(df: pd.DataFrame) -> list:
+    """DataFrame → JSON-safe list of dicts (NaN becomes null)"""
+    df = df.reset_index()
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def _etag(request: Request, version: str) -> str:
+    key = f"{request.url.path}?{request.url.query}".encode("utf-8")
+    return f'W/"{version}-{hashlib.sha1(key).hexdigest()[:12]}"'
+
+
+def _etag_matches(if_none_match, etag: str) -> bool:
+    """If-None-Match is a comma-separated list of entity tags, or `*` for any"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cached(request: Request, build):
+    """Catalog responses are immutable per catalog version: ETag + Cache-Control, 304 on match"""
+    etag = _etag(request, get_store().version)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(build(), headers=headers)
+
+
+def _check_diet(diet):
+    if diet is not None and diet not in DIETS:
+        raise HTTPException(422, f"diet must be one of {DIETS}")
+
+
+# -----------------------------------------------------
+# CATALOG
+# -----------------------------------------------------
+@app.get("/catalog/version")
+def catalog_version():
+    return {"version": get_store().version}
+
+
+@app.get("/catalog/categories")
+def categories(request: Request, diet: Optional[str] = None):
+    _check_diet(diet)
+    return cached(request, lambda: get_store().categories(diet=diet))
+
+
+@app.get("/catalog/search")
+def search(
+    request: Request,
+    q: Optional[str] = None,
+    category: List[str] = Query(default=[]),
+    diet: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    _check_diet(diet)
+    return cached(request, lambda: _records(
+        get_store().search(diet=diet, categories=category, term=q, limit=limit)
+    ))
+
+
+@app.get("/catalog/top")
+def top(
+    request: Request,
+    nutrient: str,
+    k: int = Query(10, ge=1, le=100),
+    category: Optional[str] = None,
+    q: Optional[str] = None,
+):
+    if nutrient not in NUTRIENT_COLS:
+        raise HTTPException(422, f"nutrient must be one of {NUTRIENT_COLS}")
+    return cached(request, lambda: _records(get_store().top(nutrient, k, category=category, term=q)))
+
+
+@app.get("/catalog/swaps")
+def swaps(
+    request: Request,
+    max_kcal: float,
+    min_protein: float,
+    diet: Optional[str] = None,
+    limit: int = Query(3, ge=1, le=50),
+):
+    _check_diet(diet)
+    return cached(request, lambda: _records(get_store().swaps(max_kcal, min_protein, diet=diet, limit=limit)))
+
+
+@app.get("/catalog/foods/{fdc_id}")
+def food(request: Request, fdc_id: int):
+    # the lookup runs inside build(), so a conditional request that matches is answered without it
+    def build():
+        rows = get_store().get_many([fdc_id])
+        if rows.empty:
+            raise HTTPException(404, "food not found")
+        return {**_records(rows)[0], "portions": get_store().portions(fdc_id)}
+
+    return cached(request, build)
+
+
+@app.get("/catalog/foods/{fdc_id}/similar")
+def similar(
+    request: Request,
+    fdc_id: int,
+    k: int = Query(5, ge=1, le=50),
+    diet: Optional[str] = None,
+    category: List[str] = Query(default=[]),
+):
+    _check_diet(diet)
+
+    def build():
+        index = get_index()
+        try:
+            return _records(index.similar_frame(fdc_id, k, diet=diet, categories=category or None))
+        except KeyError:
+            raise HTTPException(404, "food not found")
+
+    return cached(request, build)
+
+
+# -----------------------------------------------------
+# TARGETS & PLAN TOTALS
+# -----------------------------------------------------
+@app.get("/targets")
+def targets(
+    weight: float = Query(..., gt=0),
+    height: float = Query(..., gt=0),
+    age: int = Query(..., gt=0),
+    gender: str = "Male",
+    activity: str = "Sedentary",
+):
+    if activity not in ACTIVITY_LEVELS:
+        raise HTTPException(422, f"activity must be one of {list(ACTIVITY_LEVELS)}")
+    bmr = calculate_bmr(weight, height, age, gender)
+    tdee = bmr * activity_multiplier(activity)
+    return JSONResponse(
+        {"bmr": bmr, "tdee": tdee, "macros": macro_targets(tdee)},
+        headers={"Cache-Control": f"public, max-age={CATALOG_MAX_AGE}"},
+    )
+
+
+class PlanItem(BaseModel):
+    fdc_id: int
+    grams: Optional[float] = Field(None, gt=0)
+    portion: Optional[str] = None
+    quantity: float = Field(1, gt=0)
+    meal: Optional[str] = None
+
+
+class Plan(BaseModel):
+    items: List[PlanItem]
+    daily_kcal: Optional[float] = Field(None, gt=0)
+
+
+@app.post("/plan/totals")
+def totals(plan: Plan):
+    store = get_store()
+    rows = store.get_many([i.fdc_id for i in plan.items])
+    missing = sorted({i.fdc_id for i in plan.items} - set(rows.index))
+    if missing:
+        raise HTTPException(404, f"unknown fdc_ids: {missing}")
+
+    def item_grams(i: PlanItem) -> float:
+        if i.portion is None:
+            return i.grams or 100.0
+        portions = store.portions(i.fdc_id)
+        if i.portion not in portions:
+            raise HTTPException(422, f"unknown portion {i.portion!r} for fdc_id {i.fdc_id}")
+        return i.quantity * portions[i.portion]
+
+    df_plan = pd.DataFrame([{
+        "fdc_id": i.fdc_id,
+        "Meal": i.meal,
+        "Food": rows.at[i.fdc_id, "Food"],
+        "Grams": item_grams(i),
+        "Calories": rows.at[i.fdc_id, "Calories (kcal)"],
+        "Protein": rows.at[i.fdc_id, "Protein (g)"],
+        "Carbs": rows.at[i.fdc_id, "Carbs (g)"],
+        "Fat": rows.at[i.fdc_id, "Fat (g)"],
+        "Fiber": rows.at[i.fdc_id, "Fiber (g)"],
+        "Sugar": rows.at[i.fdc_id, "Sugar (g)"],
+    } for i in plan.items], columns=["fdc_id", "Meal", "Food", "Grams", "Calories", "Protein", "Carbs", "Fat", "Fiber", "Sugar"])
+    df_plan = scale_plan(df_plan)
+    sums = plan_totals(df_plan).fillna(0).to_dict()
+
+    out = {"items": _records(df_plan.set_index("fdc_id")), "totals": sums}
+    if plan.daily_kcal:
+        out["targets"] = macro_targets(plan.daily_kcal)
+        out["kcal_progress"] = sums["Calories"] / plan.daily_kcal
+    return out
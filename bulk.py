@@ -0,0 +1,418 @@
+# bulk.py — streaming bulk import/export of users, feedback and meal plans
+#
+# Records are read and written as CSV or JSONL (chosen by file extension) in
+# bounded batches, so memory stays flat however large the file. On Postgres each
+# batch goes through `COPY` into a staging table; other backends (the SQLite
+# stand-in) fall back to batched inserts. Import progress is committed in the
+# same transaction as each batch, so an interrupted import resumes exactly
+# where it stopped:
+#
+#   python bulk.py import users clinic_users.csv
+#   python bulk.py import meal_plans plans.jsonl --batch-size 2000
+#   python bulk.py export feedback feedback.csv
+#   python bulk.py export users users.jsonl --with-password-hashes
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+import db
+from db import bcrypt, sa
+
+DEFAULT_BATCH_SIZE = 5000
+HASH_WORKERS = os.cpu_count() or 4
+# bcrypt's own default cost (~0.25 s per hash per core). Each hash stores its cost,
+# so accounts imported at a lower one still log in normally.
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+# -----------------------------------------------------
+# RECORD KINDS
+# -----------------------------------------------------
+def _text(v):
+    v = str(v).strip()
+    return v or None
+
+
+def _datetime(v):
+    return v if isinstance(v, datetime) else datetime.fromisoformat(str(v).strip())
+
+
+# per kind: columns as written to the database (with their converters), the
+# columns a record must have, and the export query
+KINDS = {
+    "users": {
+        "columns": {"username": _text, "email": _text, "password": str, "weight": float,
+                    "height": float, "age": int, "gender": _text, "activity": _text},
+        "required": ["username", "email", "password"],
+        "export": "SELECT username, email, weight, height, age, gender, activity, created_at{hashes} "
+                  "FROM users ORDER BY id",
+    },
+    "feedback": {
+        "columns": {"name": _text, "email": _text, "subject": _text, "message": _text,
+                    "submitted_at": _datetime},
+        "required": ["message"],
+        "export": "SELECT name, email, subject, message, submitted_at FROM feedback ORDER BY id",
+    },
+    "meal_plans": {
+        # users are referenced by username, so plans move between databases
+        "columns": {"username": _text, "meal": _text, "fdc_id": int, "grams": float},
+        "required": ["username", "meal", "fdc_id", "grams"],
+        # recipe entries point at per-database recipe ids, so only foods are exported
+        "export": "SELECT u.username, m.meal, m.fdc_id, m.grams, m.created_at "
+                  "FROM meal_plans m JOIN users u ON u.id = m.user_id "
+                  "WHERE m.fdc_id IS NOT NULL ORDER BY m.id",
+    },
+}
+
+# Postgres: COPY lands in a per-connection staging table, then one INSERT … SELECT
+# moves the batch into place (skipping duplicates / unknown users)
+_PG_STAGE = {
+    "users": """
+        CREATE TEMP TABLE IF NOT EXISTS bulk_stage_users (
+            username TEXT, email TEXT, password TEXT, weight NUMERIC, height NUMERIC,
+            age INT, gender TEXT, activity TEXT
+        ) ON COMMIT DELETE ROWS
+    """,
+    "feedback": """
+        CREATE TEMP TABLE IF NOT EXISTS bulk_stage_feedback (
+            name TEXT, email TEXT, subject TEXT, message TEXT, submitted_at TIMESTAMP
+        ) ON COMMIT DELETE ROWS
+    """,
+    "meal_plans": """
+        CREATE TEMP TABLE IF NOT EXISTS bulk_stage_meal_plans (
+            username TEXT, meal TEXT, fdc_id INT, grams DOUBLE PRECISION
+        ) ON COMMIT DELETE ROWS
+    """,
+}
+_PG_MERGE = {
+    "users": """
+        INSERT INTO users (username, email, password, weight, height, age, gender, activity)
+        SELECT username, email, password, weight, height, age, gender, activity FROM bulk_stage_users
+        ON CONFLICT DO NOTHING
+    """,
+    "feedback": """
+        INSERT INTO feedback (name, email, subject, message, submitted_at)
+        SELECT name, email, subject, message, submitted_at FROM bulk_stage_feedback
+    """,
+    "meal_plans": """
+        INSERT INTO meal_plans (user_id, meal, fdc_id, grams)
+        SELECT u.id, s.meal, s.fdc_id, s.grams
+        FROM bulk_stage_meal_plans s JOIN users u ON u.username = s.username
+    """,
+}
+
+
+# -----------------------------------------------------
+# FILES
+# -----------------------------------------------------
+def file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"❌ Unknown file type for {path!r} (expected .csv or .jsonl)")
+
+
+def read_records(path: str):
+    """Yield records (dicts) one at a time"""
+    with open(path, newline="", encoding="utf-8") as fh:
+        if file_format(path) == "csv":
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(records, size: int):
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _jsonable(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+# -----------------------------------------------------
+# IMPORT
+# -----------------------------------------------------
+# never written to disk in plain form (rejects file)
+SECRET_FIELDS = ("password", "password_hash")
+
+
+def redact(rec: dict) -> dict:
+    return {k: ("***" if k in SECRET_FIELDS and v not in (None, "") else v) for k, v in rec.items()}
+
+
+def _hash(password: str, rounds: int = DEFAULT_BCRYPT_ROUNDS) -> str:
+    # bcrypt releases the GIL while hashing, so threads use every core
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def clean(kind: str, rec: dict) -> dict:
+    """Convert one raw record to database columns; raises ValueError on bad input"""
+    spec = KINDS[kind]
+    rec = dict(rec)
+    if kind == "users" and rec.get("password_hash"):
+        # already-hashed passwords (e.g. from an export) are taken as they are
+        if not str(rec["password_hash"]).startswith("$2"):
+            raise ValueError("password_hash is not a bcrypt hash")
+        rec["password"] = rec["password_hash"]
+    if kind == "feedback" and not rec.get("submitted_at"):
+        rec["submitted_at"] = datetime.now()
+
+    out = {}
+    for col, convert in spec["columns"].items():
+        v = rec.get(col)
+        try:
+            out[col] = None if v is None or v == "" else convert(v)
+        except (TypeError, ValueError):
+            raise ValueError(f"bad value for {col!r}: {v!r}")
+    missing = [c for c in spec["required"] if out.get(c) is None]
+    if missing:
+        raise ValueError("missing " + ", ".join(missing))
+    if kind == "users":
+        out["_hashed"] = bool(rec.get("password_hash"))
+    return out
+
+
+def _taken_users(conn, rows) -> set:
+    """Usernames and emails of `rows` that are already in the database"""
+    users = db.users
+    taken = conn.execute(sa.select(users.c.username, users.c.email).where(sa.or_(
+        users.c.username.in_([r["username"] for r in rows]),
+        users.c.email.in_([r["email"] for r in rows]),
+    ))).all()
+    return {v for pair in taken for v in pair}
+
+
+def _new_users(conn, rows) -> list:
+    """Drop rows whose username or email exists (or repeats in the batch) — before
+    any password is hashed, since hashing is by far the slowest step of an import"""
+    seen = _taken_users(conn, rows) if rows else set()
+    out = []
+    for r in rows:
+        if r["username"] in seen or r["email"] in seen:
+            continue
+        seen.update((r["username"], r["email"]))
+        out.append(r)
+    return out
+
+
+def _hash_new_passwords(rows, pool, rounds: int = DEFAULT_BCRYPT_ROUNDS):
+    todo = [i for i, r in enumerate(rows) if not r.pop("_hashed")]
+    for i, hashed in zip(todo, pool.map(partial(_hash, rounds=rounds), [rows[i]["password"] for i in todo])):
+        rows[i]["password"] = hashed
+
+
+def _copy_batch(conn, kind: str, rows) -> int:
+    """Postgres: COPY the batch into staging and merge it; returns rows inserted"""
+    cols = list(KINDS[kind]["columns"])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        writer.writerow(["" if r[c] is None else _jsonable(r[c]) for c in cols])
+    buf.seek(0)
+
+    conn.execute(sa.text(_PG_STAGE[kind]))
+    cur = conn.connection.cursor()
+    cur.copy_expert(f"COPY bulk_stage_{kind} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", buf)
+    return conn.execute(sa.text(_PG_MERGE[kind])).rowcount
+
+
+def _insert_batch(conn, kind: str, rows) -> int:
+    """Other backends: batched executemany inserts; returns rows inserted"""
+    if kind == "meal_plans":
+        names = {r["username"] for r in rows}
+        ids = dict(conn.execute(sa.select(db.users.c.username, db.users.c.id)
+                                .where(db.users.c.username.in_(names))).all())
+        rows = [{"user_id": ids[r["username"]], "meal": r["meal"], "fdc_id": r["fdc_id"], "grams": r["grams"]}
+                for r in rows if r["username"] in ids]
+    if not rows:
+        return 0
+
+    table = getattr(db, kind)
+    stmt = table.insert()
+    if kind == "users":
+        if conn.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).on_conflict_do_nothing()
+        else:
+            # no portable ON CONFLICT: leave out users created since the batch was checked
+            taken = _taken_users(conn, rows)
+            rows = [r for r in rows if r["username"] not in taken and r["email"] not in taken]
+            if not rows:
+                return 0
+    return conn.execute(stmt, rows).rowcount
+
+
+def import_records(kind: str, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                   workers: int = HASH_WORKERS, restart: bool = False, log=print,
+                   bcrypt_rounds: int = DEFAULT_BCRYPT_ROUNDS) -> dict:
+    """Stream `path` into the `kind` table; resumes an interrupted import of the same file"""
+    if kind not in KINDS:
+        raise ValueError(f"❌ Unknown kind {kind!r} (expected one of {', '.join(KINDS)})")
+    file_format(path)
+
+    stat = os.stat(path)
+    source = os.path.abspath(path)
+    # a changed file is a new job, never a resume
+    job = f"{kind}:{source}:{stat.st_size}:{stat.st_mtime_ns}"
+    jobs = db.bulk_jobs
+    engine = db.engine
+
+    with engine.begin() as conn:
+        if restart:
+            conn.execute(jobs.delete().where(jobs.c.job == job))
+        done = conn.execute(sa.select(jobs.c.done).where(jobs.c.job == job)).scalar()
+        if done is None:
+            done = 0
+            conn.execute(jobs.insert().values(job=job, kind=kind, source=source, done=0, updated_at=datetime.now()))
+    if done:
+        log(f"↪️  Resuming {kind} import of {path} after {done} records")
+
+    stats = {"read": done, "inserted": 0, "skipped": 0, "rejected": 0}
+    rejects_path = path + ".rejects.jsonl"
+    records = read_records(path)
+    for _ in range(done):
+        next(records, None)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            open(rejects_path, "a", encoding="utf-8") as rejects:
+        for batch in batched(records, batch_size):
+            rows = []
+            for n, rec in enumerate(batch, start=stats["read"] + 1):
+                try:
+                    rows.append(clean(kind, rec))
+                except ValueError as e:
+                    stats["rejected"] += 1
+                    rejects.write(json.dumps({"record": n, "error": str(e), "data": redact(rec)},
+                                             default=_jsonable, ensure_ascii=False) + "\n")
+            cleaned = len(rows)
+            if kind == "users":
+                with engine.connect() as conn:
+                    rows = _new_users(conn, rows)
+                _hash_new_passwords(rows, pool, bcrypt_rounds)
+
+            with engine.begin() as conn:
+                if rows:
+                    if conn.dialect.name == "postgresql":
+                        inserted = _copy_batch(conn, kind, rows)
+                    else:
+                        inserted = _insert_batch(conn, kind, rows)
+                else:
+                    inserted = 0
+                stats["read"] += len(batch)
+                conn.execute(jobs.update().where(jobs.c.job == job)
+                             .values(done=stats["read"], updated_at=datetime.now()))
+
+            stats["inserted"] += inserted
+            stats["skipped"] += cleaned - inserted
+            rate = (stats["read"] - done) / max(time.perf_counter() - start, 1e-9)
+            log(f"   {kind}: {stats['read']} read, {stats['inserted']} inserted, "
+                f"{stats['skipped']} skipped, {stats['rejected']} rejected — {rate:.0f} records/s")
+
+    if not stats["rejected"] and os.path.exists(rejects_path) and not os.path.getsize(rejects_path):
+        os.remove(rejects_path)
+    elif stats["rejected"]:
+        log(f"⚠️  {stats['rejected']} rejected records written to {rejects_path}")
+    return stats
+
+
+# -----------------------------------------------------
+# EXPORT
+# -----------------------------------------------------
+def export_records(kind: str, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                   with_password_hashes: bool = False) -> int:
+    """Stream the `kind` table to `path`; returns the number of records written"""
+    if kind not in KINDS:
+        raise ValueError(f"❌ Unknown kind {kind!r} (expected one of {', '.join(KINDS)})")
+    fmt = file_format(path)
+    sql = KINDS[kind]["export"].format(hashes=", password AS password_hash" if with_password_hashes else "")
+
+    tmp = path + ".tmp"
+    count = 0
+    with db.engine.connect() as conn, open(tmp, "w", newline="", encoding="utf-8") as fh:
+        if fmt == "csv" and conn.dialect.name == "postgresql":
+            cur = conn.connection.cursor()
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", fh)
+            count = cur.rowcount
+        else:
+            result = conn.execution_options(stream_results=True).execute(sa.text(sql))
+            cols = list(result.keys())
+            writer = csv.writer(fh) if fmt == "csv" else None
+            if writer:
+                writer.writerow(cols)
+            for part in result.partitions(batch_size):
+                for row in part:
+                    values = [_jsonable(v) for v in row]
+                    if writer:
+                        writer.writerow(values)
+                    else:
+                        fh.write(json.dumps(dict(zip(cols, values)), ensure_ascii=False) + "\n")
+                count += len(part)
+    os.replace(tmp, path)
+    return count
+
+
+# -----------------------------------------------------
+# CLI
+# -----------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of users, feedback and meal plans")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="load a CSV/JSONL file into the database")
+    imp.add_argument("kind", choices=list(KINDS))
+    imp.add_argument("path")
+    imp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    imp.add_argument("--workers", type=int, default=HASH_WORKERS, help="parallel password-hashing threads")
+    imp.add_argument("--restart", action="store_true", help="ignore earlier progress on this file")
+    imp.add_argument("--bcrypt-rounds", type=int, default=DEFAULT_BCRYPT_ROUNDS,
+                     help="bcrypt cost for plain-text passwords (4-31; each step halves the time)")
+
+    exp = sub.add_parser("export", help="write a table to a CSV/JSONL file")
+    exp.add_argument("kind", choices=list(KINDS))
+    exp.add_argument("path")
+    exp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    exp.add_argument("--with-password-hashes", action="store_true",
+                     help="include bcrypt hashes so accounts can be re-imported elsewhere")
+    args = parser.parse_args(argv)
+
+    if args.command == "import" and not 4 <= args.bcrypt_rounds <= 31:
+        parser.error("--bcrypt-rounds must be between 4 and 31")
+
+    start = time.perf_counter()
+    if args.command == "import":
+        stats = import_records(args.kind, args.path, args.batch_size, args.workers, args.restart,
+                               bcrypt_rounds=args.bcrypt_rounds)
+        print(f"✅ Imported {stats['inserted']} {args.kind} in {time.perf_counter() - start:.1f} s")
+        return 1 if stats["rejected"] else 0
+
+    count = export_records(args.kind, args.path, args.batch_size, args.with_password_hashes)
+    print(f"✅ Exported {count} {args.kind} to {args.path} in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# catalog.py — shared USDA catalog constants & diet rules
+import pandas as pd
+
+# -----------------------------------------------------
+# DATA SOURCE
+# -----------------------------------------------------
+DATA_URL = "https://drive.google.com/uc?export=download&id=1SjGNAij9o5q4V_62qfMkcjFegQvj5Ij2"
+
+NUTRIENT_COLS = ["Calories (kcal)", "Protein (g)", "Carbs (g)", "Fat (g)", "Fiber (g)", "Sugar (g)"]
+
+# -----------------------------------------------------
+# DIET RULES (keyword based, matched on food + category)
+# -----------------------------------------------------
+DIETS = ["Non-Vegetarian", "Vegetarian", "Vegan"]
+
+NONVEG_KEYWORDS = [
+    "meat","fish","pork","chicken","beef","turkey","lamb","goat",
+    "duck","veal","shellfish","crab","lobster","shrimp","oyster",
+    "clam","anchovy","tuna","salmon","mackerel","sardine"
+]
+VEGAN_EXCLUDE = ["milk","cheese","butter","yogurt","cream","egg"]
+
+
+def diet_mask(data: pd.DataFrame, diet: str, food_col="Food", category_col="Category") -> pd.Series:
+    """Boolean mask of rows allowed for the given diet type"""
+    mask = pd.Series(True, index=data.index)
+
+    def _hits(keywords):
+        pattern = "|".join(keywords)
+        return (
+            data[category_col].str.contains(pattern, case=False, na=False) |
+            data[food_col].str.contains(pattern, case=False, na=False)
+        )
+
+    if diet in ["Vegetarian", "Vegan"]:
+        mask &= ~_hits(NONVEG_KEYWORDS)
+    if diet == "Vegan":
+        mask &= ~_hits(VEGAN_EXCLUDE)
+    return mask
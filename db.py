@@ -1,14 +1,15 @@
 # db.py — handles all database interactions
 import os
-import bcrypt
 import streamlit as st
-from sqlalchemy import (
-    create_engine, MetaData, Table, Column,
-    Integer, String, Float, Text
-)
-from sqlalchemy.sql import select, or_, text
-from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from types import SimpleNamespace
 from dotenv import load_dotenv
+from lazy import lazy_import, lazy_resource
+
+# bcrypt / SQLAlchemy are only imported (and the database only contacted)
+# on the first call that needs them, not when a page imports this module
+bcrypt = lazy_import("bcrypt")
+sa = lazy_import("sqlalchemy")
 
 # -----------------------------------------------------
 # LOAD ENVIRONMENT VARIABLES
@@ -28,53 +29,146 @@ def get_env_var(name: str) -> str:
 
 
 # -----------------------------------------------------
-# DATABASE CONNECTION
+# DATABASE CONNECTION (built on first use)
 # -----------------------------------------------------
-DATABASE_URL = get_env_var("DATABASE_URL")
+def _neon_url():
+    """Older setups configured the Feedback page with NEON_* variables only;
+    they keep working by building the URL from those"""
+    host = get_env_var("NEON_HOST")
+    if not host:
+        return None
+    return sa.engine.URL.create(
+        "postgresql+psycopg2",
+        username=get_env_var("NEON_USER"),
+        password=get_env_var("NEON_PASSWORD"),
+        host=host,
+        database=get_env_var("NEON_DBNAME"),
+        query={"sslmode": get_env_var("NEON_SSLMODE") or "require"},
+    )
 
-if not DATABASE_URL:
-    raise ValueError("❌ DATABASE_URL is missing. Please set it in .env or Streamlit Secrets.")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-metadata = MetaData()
+@lazy_resource
+def _db():
+    """Engine, tables and session factory, created once per process"""
+    from sqlalchemy.orm import sessionmaker
 
-# -----------------------------------------------------
-# TABLE DEFINITION
-# -----------------------------------------------------
-users = Table(
-    "users", metadata,
-    Column("id", Integer, primary_key=True),
-    Column("username", String, unique=True, nullable=False),
-    Column("email", String, unique=True, nullable=False),
-    Column("password", Text, nullable=False),
-    Column("weight", Float),
-    Column("height", Float),
-    Column("age", Integer),
-    Column("gender", String),
-    Column("activity", String),
-)
+    DATABASE_URL = get_env_var("DATABASE_URL") or _neon_url()
 
-# -----------------------------------------------------
-# AUTO-CREATE TABLE IF MISSING
-# -----------------------------------------------------
-with engine.begin() as conn:
-    conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            weight NUMERIC,
-            height NUMERIC,
-            age INT,
-            gender TEXT,
-            activity TEXT,
-            created_at TIMESTAMP DEFAULT NOW()
-        )
-    """))
-metadata.create_all(engine)
-
-Session = sessionmaker(bind=engine)
+    if not DATABASE_URL:
+        raise ValueError("❌ DATABASE_URL is missing. Please set it in .env or Streamlit Secrets.")
+
+    engine = sa.create_engine(DATABASE_URL, pool_pre_ping=True)
+    metadata = sa.MetaData()
+
+    # -------------------------------------------------
+    # TABLE DEFINITION
+    # -------------------------------------------------
+    users = sa.Table(
+        "users", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String, unique=True, nullable=False),
+        sa.Column("email", sa.String, unique=True, nullable=False),
+        sa.Column("password", sa.Text, nullable=False),
+        sa.Column("weight", sa.Float),
+        sa.Column("height", sa.Float),
+        sa.Column("age", sa.Integer),
+        sa.Column("gender", sa.String),
+        sa.Column("activity", sa.String),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+    feedback = sa.Table(
+        "feedback", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.Text),
+        sa.Column("email", sa.Text),
+        sa.Column("subject", sa.Text),
+        sa.Column("message", sa.Text),
+        sa.Column("submitted_at", sa.DateTime),
+    )
+
+    meal_plans = sa.Table(
+        "meal_plans", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("meal", sa.String, nullable=False),
+        # an entry is either a catalog food (fdc_id) or one of the user's recipes
+        sa.Column("fdc_id", sa.Integer, nullable=True),
+        sa.Column("recipe_id", sa.Integer, sa.ForeignKey("recipes.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("grams", sa.Float, nullable=False),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+    recipes = sa.Table(
+        "recipes", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("name", sa.String, nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now()),
+    )
+
+    recipe_ingredients = sa.Table(
+        "recipe_ingredients", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("recipe_id", sa.Integer, sa.ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True),
+        sa.Column("fdc_id", sa.Integer, nullable=False),
+        sa.Column("grams", sa.Float, nullable=False),
+    )
+
+    # progress of resumable bulk imports (bulk.py), committed with each batch
+    bulk_jobs = sa.Table(
+        "bulk_jobs", metadata,
+        sa.Column("job", sa.String, primary_key=True),
+        sa.Column("kind", sa.String, nullable=False),
+        sa.Column("source", sa.Text),
+        sa.Column("done", sa.Integer, nullable=False, default=0),
+        sa.Column("updated_at", sa.DateTime),
+    )
+
+    # -------------------------------------------------
+    # AUTO-CREATE TABLE IF MISSING
+    # -------------------------------------------------
+    # Postgres keeps its original hand-written DDL; other backends (e.g. a local
+    # SQLite stand-in for tests / load tests) are created from the Table metadata.
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(sa.text("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    weight NUMERIC,
+                    height NUMERIC,
+                    age INT,
+                    gender TEXT,
+                    activity TEXT,
+                    created_at TIMESTAMP DEFAULT NOW()
+                )
+            """))
+    metadata.create_all(engine)
+    if engine.dialect.name == "postgresql":
+        # meal_plans created before recipe entries existed
+        with engine.begin() as conn:
+            conn.execute(sa.text(
+                "ALTER TABLE meal_plans ADD COLUMN IF NOT EXISTS recipe_id INTEGER "
+                "REFERENCES recipes(id) ON DELETE CASCADE"
+            ))
+            conn.execute(sa.text("ALTER TABLE meal_plans ALTER COLUMN fdc_id DROP NOT NULL"))
+
+    return SimpleNamespace(
+        engine=engine, metadata=metadata, users=users, feedback=feedback,
+        meal_plans=meal_plans, recipes=recipes, recipe_ingredients=recipe_ingredients,
+        bulk_jobs=bulk_jobs, Session=sessionmaker(bind=engine),
+    )
+
+
+def __getattr__(name):
+    # keeps `db.engine`, `db.users`, ... working for callers outside this module
+    if name in ("engine", "metadata", "users", "feedback", "meal_plans", "recipes",
+                "recipe_ingredients", "bulk_jobs", "Session"):
+        return getattr(_db(), name)
+    raise AttributeError(f"module 'db' has no attribute {name!r}")
 
 # -----------------------------------------------------
 # HELPER FUNCTION
@@ -89,8 +183,10 @@ def _row_to_dict(row):
 # CRUD FUNCTIONS
 # -----------------------------------------------------
 def user_exists(username, email):
-    with Session() as ses:
-        q = select(users).where(or_(
+    db = _db()
+    users = db.users
+    with db.Session() as ses:
+        q = sa.select(users).where(sa.or_(
             users.c.username == username,
             users.c.email == email
         ))
@@ -100,9 +196,10 @@ def user_exists(username, email):
 def register_user(username, email, password, weight=None, height=None, age=None, gender=None, activity=None):
     """Registers a new user with bcrypt password hashing"""
     hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    with Session() as ses:
+    db = _db()
+    with db.Session() as ses:
         try:
-            ses.execute(users.insert().values(
+            ses.execute(db.users.insert().values(
                 username=username.strip(),
                 email=email.strip(),
                 password=hashed_pw,
@@ -122,8 +219,10 @@ def register_user(username, email, password, weight=None, height=None, age=None,
 
 def login_user(identifier, password):
     """Login using username OR email"""
-    with Session() as ses:
-        q = select(users).where(or_(
+    db = _db()
+    users = db.users
+    with db.Session() as ses:
+        q = sa.select(users).where(sa.or_(
             users.c.username.ilike(identifier.strip()),
             users.c.email.ilike(identifier.strip())
         ))
@@ -141,12 +240,134 @@ def login_user(identifier, password):
 
 def update_user(user_id, updates: dict):
     """Update user profile details"""
-    with Session() as ses:
+    db = _db()
+    with db.Session() as ses:
         try:
-            ses.execute(users.update().where(users.c.id == user_id).values(**updates))
+            ses.execute(db.users.update().where(db.users.c.id == user_id).values(**updates))
             ses.commit()
             return True
         except Exception as e:
             ses.rollback()
             print("❌ Error updating user:", e)
             return False
+
+
+def add_feedback(name, email, subject, message):
+    """Store one feedback message"""
+    db = _db()
+    with db.Session() as ses:
+        try:
+            ses.execute(db.feedback.insert().values(
+                name=name,
+                email=email,
+                subject=subject,
+                message=message,
+                submitted_at=datetime.now()
+            ))
+            ses.commit()
+            return True
+        except Exception as e:
+            ses.rollback()
+            print("❌ Error saving feedback:", e)
+            return False
+
+
+def save_meal_plan(user_id, cart):
+    """Replace the user's saved meal plan with the cart.
+
+    Entries are foods ({"fdc_id", "Meal", "Grams"}) or saved recipes
+    ({"recipe": recipe id, "Meal", "Grams"}); session-only recipes have no id to
+    store, so callers should leave them out.
+    """
+    db = _db()
+    with db.Session() as ses:
+        try:
+            ses.execute(db.meal_plans.delete().where(db.meal_plans.c.user_id == user_id))
+            if cart:
+                ses.execute(db.meal_plans.insert(), [
+                    {"user_id": user_id, "meal": item["Meal"],
+                     "fdc_id": int(item["fdc_id"]) if "fdc_id" in item else None,
+                     "recipe_id": int(item["recipe"]) if "recipe" in item else None,
+                     "grams": float(item["Grams"])}
+                    for item in cart
+                ])
+            ses.commit()
+            return True
+        except Exception as e:
+            ses.rollback()
+            print("❌ Error saving meal plan:", e)
+            return False
+
+
+def load_meal_plan(user_id):
+    """The user's saved meal plan as cart entries"""
+    db = _db()
+    mp = db.meal_plans
+    with db.Session() as ses:
+        q = (sa.select(mp.c.fdc_id, mp.c.recipe_id, mp.c.meal, mp.c.grams)
+             .where(mp.c.user_id == user_id).order_by(mp.c.id))
+        return [
+            {"recipe": r.recipe_id, "Meal": r.meal, "Grams": r.grams} if r.recipe_id is not None
+            else {"fdc_id": r.fdc_id, "Meal": r.meal, "Grams": r.grams}
+            for r in ses.execute(q)
+        ]
+
+
+def save_recipe(user_id, name, ingredients, recipe_id=None):
+    """Create (or replace) a recipe from (fdc_id, grams) pairs; returns its id, None on failure"""
+    db = _db()
+    with db.Session() as ses:
+        try:
+            if recipe_id is None:
+                recipe_id = ses.execute(db.recipes.insert().values(
+                    user_id=user_id, name=name.strip(), updated_at=datetime.now()
+                )).inserted_primary_key[0]
+            else:
+                updated = ses.execute(db.recipes.update()
+                                      .where(db.recipes.c.id == recipe_id, db.recipes.c.user_id == user_id)
+                                      .values(name=name.strip(), updated_at=datetime.now()))
+                if updated.rowcount != 1:
+                    raise ValueError(f"recipe {recipe_id} not found for this user")
+                ses.execute(db.recipe_ingredients.delete().where(db.recipe_ingredients.c.recipe_id == recipe_id))
+            ses.execute(db.recipe_ingredients.insert(), [
+                {"recipe_id": recipe_id, "fdc_id": int(fdc_id), "grams": float(grams)}
+                for fdc_id, grams in ingredients
+            ])
+            ses.commit()
+            return recipe_id
+        except Exception as e:
+            ses.rollback()
+            print("❌ Error saving recipe:", e)
+            return None
+
+
+def load_recipes(user_id):
+    """The user's recipes as {id: {"name": ..., "ingredients": [(fdc_id, grams), ...]}}"""
+    db = _db()
+    r, ri = db.recipes, db.recipe_ingredients
+    with db.Session() as ses:
+        q = (sa.select(r.c.id, r.c.name, ri.c.fdc_id, ri.c.grams)
+             .join(ri, ri.c.recipe_id == r.c.id)
+             .where(r.c.user_id == user_id)
+             .order_by(r.c.name, r.c.id, ri.c.id))
+        out = {}
+        for row in ses.execute(q):
+            recipe = out.setdefault(row.id, {"name": row.name, "ingredients": []})
+            recipe["ingredients"].append((row.fdc_id, row.grams))
+        return out
+
+
+def delete_recipe(user_id, recipe_id):
+    db = _db()
+    with db.Session() as ses:
+        try:
+            deleted = ses.execute(db.recipes.delete()
+                                  .where(db.recipes.c.id == recipe_id, db.recipes.c.user_id == user_id))
+            if deleted.rowcount:
+                ses.execute(db.recipe_ingredients.delete().where(db.recipe_ingredients.c.recipe_id == recipe_id))
+            ses.commit()
+            return bool(deleted.rowcount)
+        except Exception as e:
+            ses.rollback()
+            print("❌ Error deleting recipe:", e)
+            return False
@@ -0,0 +1,138 @@
+# importtime.py — cold-import report and startup-time budget for every page
+#
+# Each page's top-level import statements are executed in a fresh interpreter
+# (so nothing is cached in sys.modules) and timed. With --first-run, each page's
+# first full script run (AppTest) in a fresh interpreter is timed as well, so
+# resources built on page load (store, indexes, clients) count too. Exits non-zero
+# when any page exceeds a budget, so it can gate CI:
+#
+#   python importtime.py                  # report + check against the default budget
+#   python importtime.py --budget-ms 800 --repeat 5
+#   python importtime.py --first-run --first-run-budget-ms 4000
+import argparse
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+PAGES = [ROOT / "Homepage.py"] + sorted((ROOT / "pages").glob("*.py"))
+
+DEFAULT_BUDGET_MS = 1500
+DEFAULT_FIRST_RUN_BUDGET_MS = 5000
+FIRST_RUN_TIMEOUT = 120
+TOP_OFFENDERS = 5
+
+
+def page_imports(path: Path) -> str:
+    """Source of the page's module-level import statements"""
+    source = path.read_text(encoding="utf-8")
+    tree = ast.parse(source)
+    stmts = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.get_source_segment(source, n) for n in stmts)
+
+
+def _run(code: str, importtime: bool = True):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    return proc.stdout, proc.stderr
+
+
+def _top_level(importtime_log: str) -> dict:
+    """{module: cumulative µs} for the outermost imports in a -X importtime log"""
+    out = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith(" ") and not name.startswith("  "):
+            try:
+                out[name.strip()] = int(cumulative)
+            except ValueError:
+                pass  # header line
+    return out
+
+
+def measure(path: Path, repeat: int, startup: set):
+    """(best seconds, [(module, ms), ...]) for one page"""
+    code = (
+        "import time as _t\n_s = _t.perf_counter()\n"
+        + page_imports(path)
+        + "\nprint(_t.perf_counter() - _s)"
+    )
+    best, offenders = None, []
+    for _ in range(repeat):
+        stdout, stderr = _run(code)
+        seconds = float(stdout.strip().splitlines()[-1])
+        if best is None or seconds < best:
+            best = seconds
+            modules = {m: us for m, us in _top_level(stderr).items() if m not in startup}
+            offenders = sorted(modules.items(), key=lambda kv: -kv[1])[:TOP_OFFENDERS]
+    return best, [(m, us / 1000) for m, us in offenders]
+
+
+def first_run(path: Path, repeat: int) -> float:
+    """Best seconds for the page's first AppTest run in a fresh interpreter"""
+    code = (
+        "import time as _t\n_s = _t.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"_at = AppTest.from_file({str(path)!r}, default_timeout={FIRST_RUN_TIMEOUT})\n"
+        "_at.run()\n"
+        "print(_t.perf_counter() - _s)\n"
+        "if _at.exception:\n"
+        "    raise SystemExit(f'page raised: {_at.exception[0].value}')\n"
+    )
+    return min(float(_run(code, importtime=False)[0].strip().splitlines()[-1]) for _ in range(repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-import report and budget check for every page")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page; the fastest counts")
+    parser.add_argument("--first-run", action="store_true",
+                        help="also time each page's first full run (imports + page-load resources)")
+    parser.add_argument("--first-run-budget-ms", type=float, default=DEFAULT_FIRST_RUN_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    # modules the bare interpreter already imports are not the page's cost
+    startup = set(_top_level(_run("pass")[1]))
+
+    over = []
+    for page in PAGES:
+        seconds, offenders = measure(page, args.repeat, startup)
+        ms = seconds * 1000
+        flag = "OVER" if ms > args.budget_ms else "ok"
+        print(f"{flag:>4}  {ms:8.1f} ms  {page.relative_to(ROOT)}")
+        for module, mod_ms in offenders:
+            print(f"      {mod_ms:8.1f} ms    {module}")
+        if ms > args.budget_ms:
+            over.append(page.name)
+
+    print(f"\nBudget: {args.budget_ms:.0f} ms per page")
+
+    if args.first_run:
+        # one untimed run builds the on-disk catalog store; what is timed below is
+        # the per-process cold start every new worker pays
+        first_run(PAGES[0], 1)
+        print()
+        for page in PAGES:
+            ms = first_run(page, args.repeat) * 1000
+            flag = "OVER" if ms > args.first_run_budget_ms else "ok"
+            print(f"{flag:>4}  {ms:8.1f} ms  {page.relative_to(ROOT)} (first run)")
+            if ms > args.first_run_budget_ms:
+                over.append(f"{page.name} (first run)")
+        print(f"\nFirst-run budget: {args.first_run_budget_ms:.0f} ms per page")
+    if over:
+        print("Over budget: " + ", ".join(over))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# lazy.py — defer heavy imports and clients until first use
+import functools
+import importlib
+import threading
+import types
+
+_UNSET = object()
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module; the real import happens on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_name"] = name
+
+    def _load(self):
+        module = importlib.import_module(self._lazy_name)
+        # copy the namespace so later lookups no longer go through __getattr__
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._lazy_name!r}>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """`bcrypt = lazy_import("bcrypt")` — import cost is paid by the first caller, not the page"""
+    return LazyModule(name)
+
+
+def lazy_resource(factory):
+    """Thread-safe, build-once wrapper for a zero-argument factory (clients, engines)"""
+    value = _UNSET
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        nonlocal value
+        if value is _UNSET:
+            with lock:
+                if value is _UNSET:
+                    value = factory()
+        return value
+
+    return get
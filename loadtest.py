@@ -0,0 +1,332 @@
+# loadtest.py — concurrent-session load test for the Streamlit pages
+#
+# Drives N scripted user journeys in parallel through Streamlit's headless
+# AppTest API, against a local SQLite (or any DATABASE_URL) stand-in, a
+# synthetic catalog and a fake OpenAI endpoint:
+#
+#   register → login → Body Metrics → add items in Meal Planner → chat → feedback
+#
+# AppTest keeps one Runtime per process, so every session runs in its own
+# process. Each process warms up (imports, store, caches) before a barrier
+# releases all journeys at once; only what follows the barrier is measured.
+#
+# Usage:
+#   python loadtest.py --sessions 20 --items 20
+#   python loadtest.py --sessions 50 --database-url postgresql://localhost/loadtest
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+PAGES = {
+    "auth": ROOT / "pages" / "1_Register_or_Login.py",
+    "metrics": ROOT / "pages" / "2_Body_Metrics.py",
+    "planner": ROOT / "pages" / "3_Meal_Planner.py",
+    "chat": ROOT / "pages" / "4_AI_Chatbot.py",
+    "feedback": ROOT / "pages" / "5_Feedback.py",
+}
+
+# session-state keys that carry over between pages, as they would in a real session
+CARRIED_KEYS = ["logged_in", "user_profile", "username", "bmr", "tdee", "macros", "cart", "chat_history"]
+
+# how long a session process may take to warm up before the others give up on it
+BARRIER_TIMEOUT = 300
+
+
+# -----------------------------------------------------
+# STAND-INS
+# -----------------------------------------------------
+class _FakeOpenAI(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        body = json.dumps({
+            "id": "chatcmpl-loadtest",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Eat more vegetables and drink water."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_openai(latency: float) -> str:
+    _FakeOpenAI.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def write_catalog(path: Path, rows: int, seed: int = 0):
+    """Synthetic catalog with the same columns as the ETL output"""
+    rng = np.random.default_rng(seed)
+    categories = ["Vegetables and Vegetable Products", "Fruits and Fruit Juices", "Poultry Products",
+                  "Dairy and Egg Products", "Legumes and Legume Products", "Cereal Grains and Pasta",
+                  "Finfish and Shellfish Products", "Nut and Seed Products"]
+    pd.DataFrame({
+        "fdc_id": np.arange(100000, 100000 + rows),
+        "Food": [f"Food item {i}" for i in range(rows)],
+        "Category": rng.choice(categories, rows),
+        "Calories (kcal)": rng.uniform(10, 600, rows).round(1),
+        "Protein (g)": rng.uniform(0, 40, rows).round(2),
+        "Carbs (g)": rng.uniform(0, 80, rows).round(2),
+        "Fat (g)": rng.uniform(0, 50, rows).round(2),
+        "Fiber (g)": rng.uniform(0, 15, rows).round(2),
+        "Sugar (g)": rng.uniform(0, 30, rows).round(2),
+    }).to_csv(path, index=False)
+
+
+# -----------------------------------------------------
+# JOURNEY
+# -----------------------------------------------------
+def _by_label(widgets, label, nth=0):
+    matches = [w for w in widgets if w.label == label]
+    if len(matches) <= nth:
+        raise LookupError(f"widget {label!r} not found")
+    return matches[nth]
+
+
+class UserSession:
+    """One simulated browser tab: carries session state from page to page and times every rerun"""
+
+    def __init__(self, n: int, items: int, timeout: float):
+        self.n = n
+        self.items = items
+        self.timeout = timeout
+        self.state = {}
+        self.timings = []   # (step, seconds)
+        self.error = None
+        self.state_bytes = 0
+        self.started = self.finished = None   # wall-clock, comparable across processes
+        self.max_rss_mb = None
+
+    def open(self, page: str):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(PAGES[page]), default_timeout=self.timeout)
+        for k, v in self.state.items():
+            at.session_state[k] = v
+        return at
+
+    def run(self, step: str, at):
+        start = time.perf_counter()
+        at.run()
+        self.timings.append((step, time.perf_counter() - start))
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].value}")
+        for k in CARRIED_KEYS:
+            if k in at.session_state:
+                self.state[k] = at.session_state[k]
+        return at
+
+    def journey(self):
+        username = f"load_{uuid.uuid4().hex[:10]}"
+        password = "load-test-password"
+
+        # register
+        at = self.run("register", self.open("auth"))
+        _by_label(at.text_input, "Username").input(username)
+        _by_label(at.text_input, "Email").input(f"{username}@example.com")
+        _by_label(at.text_input, "Password", 0).input(password)
+        _by_label(at.text_input, "Weight (kg)").input("70")
+        _by_label(at.text_input, "Height (cm)").input("175")
+        _by_label(at.text_input, "Age").input("30")
+        _by_label(at.button, "Register").click()
+        self.run("register", at)
+
+        # login
+        _by_label(at.text_input, "Username or Email").input(username)
+        _by_label(at.text_input, "Password", 1).input(password)
+        _by_label(at.button, "Login").click()
+        self.run("login", at)
+        if not self.state.get("logged_in"):
+            raise RuntimeError("login: not logged in")
+
+        # body metrics
+        self.run("metrics", self.open("metrics"))
+
+        # meal planner — select and add items one by one
+        at = self.run("planner", self.open("planner"))
+        for i in range(self.items):
+            picker = _by_label(at.selectbox, "🍲 Choose an Item")
+            picker.select_index(i % len(picker.options))
+            self.run("planner", at)
+            _by_label(at.button, "➕ Add to Plan").click()
+            self.run("planner", at)
+        if len(self.state.get("cart", [])) != self.items:
+            raise RuntimeError(f"planner: cart has {len(self.state.get('cart', []))} items")
+
+        # chat
+        at = self.run("chat", self.open("chat"))
+        at.chat_input[0].set_value("What should I eat for dinner?")
+        self.run("chat", at)
+
+        # feedback
+        at = self.run("feedback", self.open("feedback"))
+        _by_label(at.text_input, "Your Name").input(username)
+        _by_label(at.text_input, "Your Email (used in login)").input(f"{username}@example.com")
+        _by_label(at.text_input, "Subject").input("Load test")
+        _by_label(at.text_area, "Your Feedback / Query").input("Automated load-test message.")
+        _by_label(at.button, "Submit Feedback").click()
+        self.run("feedback", at)
+
+    def __call__(self):
+        self.started = time.time()
+        try:
+            self.journey()
+        except Exception as e:
+            self.error = repr(e)
+        self.finished = time.time()
+        self.state_bytes = len(pickle.dumps(self.state))
+        return self
+
+
+def _run_session(job):
+    """Worker-process entry point: warm up, wait for every other session, run one journey"""
+    n, items, timeout, barrier = job
+    # a throw-away journey pays this process's imports and cache builds
+    warmup = UserSession(-1, 1, timeout)()
+    session = UserSession(n, items, timeout)
+    try:
+        barrier.wait(BARRIER_TIMEOUT)
+    except Exception as e:
+        session.error = f"barrier: {e!r}"
+    if warmup.error:
+        session.error = f"warm-up: {warmup.error}"
+    if session.error is None:
+        session()
+    session.max_rss_mb = _max_rss_mb()
+    session.state = {}  # only its size is reported; keeps the result small to send back
+    return session
+
+
+# -----------------------------------------------------
+# REPORT
+# -----------------------------------------------------
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def report(sessions, wall):
+    failed = [s for s in sessions if s.error]
+    ok = [s for s in sessions if not s.error]
+    print(f"\nSessions: {len(sessions)} ({len(failed)} failed)")
+    if not ok:
+        return failed
+
+    # a failed journey stops early; its (partial) timings would skew the latencies
+    timings = pd.DataFrame(
+        [(s.n, step, sec) for s in ok for step, sec in s.timings],
+        columns=["session", "step", "seconds"],
+    )
+    by_step = timings.groupby("step", sort=False)["seconds"].agg(
+        reruns="count",
+        p50=lambda x: x.quantile(0.50),
+        p95=lambda x: x.quantile(0.95),
+        max="max",
+    )
+    by_step.loc["ALL"] = [
+        len(timings), timings["seconds"].quantile(0.50),
+        timings["seconds"].quantile(0.95), timings["seconds"].max(),
+    ]
+    state_kb = np.array([s.state_bytes for s in ok]) / 1024
+
+    print("Rerun latency per journey step (successful sessions)")
+    print((by_step * [1, 1000, 1000, 1000]).rename(columns={"p50": "p50 ms", "p95": "p95 ms", "max": "max ms"})
+          .round(1).to_string())
+    print(f"\nWall time: {wall:.1f} s — throughput {len(timings) / wall:.1f} reruns/s, "
+          f"{len(ok) / wall:.2f} journeys/s")
+    print(f"Session state: mean {state_kb.mean():.1f} KiB, max {state_kb.max():.1f} KiB (pickled)")
+    rss = [s.max_rss_mb for s in ok if s.max_rss_mb is not None]
+    if rss:
+        print(f"Peak RSS per session process: mean {np.mean(rss):.0f} MiB, max {max(rss):.0f} MiB")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit pages")
+    parser.add_argument("--sessions", type=int, default=10, help="parallel user sessions (one process each)")
+    parser.add_argument("--items", type=int, default=20, help="meal-planner items added per session")
+    parser.add_argument("--catalog-rows", type=int, default=8000)
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake OpenAI response delay (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout (s)")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    catalog_csv = workdir / "catalog.csv"
+    write_catalog(catalog_csv, args.catalog_rows)
+
+    # must be in place before the pages import db / store (session processes inherit it)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'loadtest.db'}"
+    os.environ["CATALOG_SOURCE"] = str(catalog_csv)
+    os.environ["CATALOG_DIR"] = str(workdir)
+    os.environ["OPENAI_BASE_URL"] = start_fake_openai(args.llm_latency)
+    os.environ["OPENAI_API_KEY"] = "loadtest"
+
+    # spawn: fresh interpreters, not forks of a process already running threads.
+    # This process never runs AppTest itself (it swaps out __main__ while running a page).
+    ctx = multiprocessing.get_context("spawn")
+
+    # warm-up: build the on-disk catalog store and the database tables once, so
+    # the session processes only open them
+    with ctx.Pool(processes=1) as pool:
+        warmup = pool.apply(UserSession(-1, 1, args.timeout))
+    if warmup.error:
+        print(f"Warm-up journey failed: {warmup.error}")
+        return 1
+
+    with ctx.Manager() as manager:
+        barrier = manager.Barrier(args.sessions)
+        jobs = [(i, args.items, args.timeout, barrier) for i in range(args.sessions)]
+        with ctx.Pool(processes=args.sessions, maxtasksperchild=1) as pool:
+            sessions = pool.map(_run_session, jobs, chunksize=1)
+
+    ran = [s for s in sessions if s.started is not None]
+    wall = max(s.finished for s in ran) - min(s.started for s in ran) if ran else 0.0
+
+    failed = report(sessions, wall)
+    for s in failed[:5]:
+        print(f"  session {s.n}: {s.error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
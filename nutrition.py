@@ -0,0 +1,60 @@
+# nutrition.py — calorie targets & meal-plan arithmetic shared by the pages and the API
+import pandas as pd
+
+ACTIVITY_LEVELS = {
+    "Sedentary": 1.2,
+    "Lightly Active": 1.375,
+    "Moderately Active": 1.55,
+    "Very Active": 1.725,
+    "Extra Active": 1.9
+}
+
+PLAN_NUTRIENTS = ["Calories", "Protein", "Carbs", "Fat", "Fiber", "Sugar"]
+
+# -----------------------------------------------------
+# BODY METRICS
+# -----------------------------------------------------
+def calculate_bmr(weight, height, age, gender):
+    """Mifflin-St Jeor formula"""
+    if gender.lower() == "male":
+        return 10*weight + 6.25*height - 5*age + 5
+    else:
+        return 10*weight + 6.25*height - 5*age - 161
+
+def activity_multiplier(activity):
+    return ACTIVITY_LEVELS.get(activity, 1.2)
+
+def macro_targets(kcal):
+    """Daily grams per macro for a calorie target (sugar is an upper limit)"""
+    return {
+        "Protein": int(kcal*0.25/4),
+        "Carbs": int(kcal*0.50/4),
+        "Fat": int(kcal*0.25/9),
+        "Fiber": int(14 * kcal / 1000),
+        "Sugar": int(kcal*0.10/4)
+    }
+
+def calculate_macros(tdee):
+    t = macro_targets(tdee)
+    return {
+        "Protein": f"{t['Protein']} g/day",
+        "Carbs": f"{t['Carbs']} g/day",
+        "Fat": f"{t['Fat']} g/day",
+        "Fiber": f"{t['Fiber']} g/day",
+        "Sugar (limit)": f"{t['Sugar']} g/day"
+    }
+
+# -----------------------------------------------------
+# MEAL PLAN
+# -----------------------------------------------------
+def scale_plan(df_plan: pd.DataFrame) -> pd.DataFrame:
+    """Per-100 g nutrient values scaled to each entry's grams"""
+    df_plan = df_plan.copy()
+    factor = df_plan["Grams"].astype(float) / 100.0
+    for c in PLAN_NUTRIENTS:
+        df_plan[c] = pd.to_numeric(df_plan[c], errors="coerce") * factor
+    return df_plan
+
+def plan_totals(df_plan: pd.DataFrame) -> pd.Series:
+    """Column totals of an already scaled plan"""
+    return df_plan[PLAN_NUTRIENTS].sum()
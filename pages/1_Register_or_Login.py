@@ -1,8 +1,12 @@
 # pages/1_Register_or_Login.py
 import streamlit as st
+from session_memory import track, memory_panel, slim_profile
 from db import register_user, login_user, user_exists
 
 
+track()
+memory_panel()
+
 st.title("🔐 Authentication")
 tabs = st.tabs(["📝 Register", "🔑 Login"])
 
@@ -77,7 +81,8 @@ with tabs[1]:
                     user = dict(user)
 
                 st.session_state["logged_in"] = True
-                st.session_state["user_profile"] = user
+                # only the fields the pages use — not the whole users row
+                st.session_state["user_profile"] = slim_profile(user)
                 st.session_state["username"] = user.get("username", "User")
 
                 st.success(f"✅ Successfully logged in as **{user['username']}**!")
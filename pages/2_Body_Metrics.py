@@ -1,8 +1,12 @@
 # pages/2_Body_Metrics.py
 import streamlit as st
+from session_memory import track, memory_panel
 from db import update_user
+from nutrition import calculate_bmr, activity_multiplier, calculate_macros
 
 st.set_page_config(page_title="Body Metrics", layout="wide")
+track()
+memory_panel()
 
 # ---------------- Ensure Login ----------------
 if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
@@ -11,32 +15,6 @@ if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
 
 profile = st.session_state["user_profile"]
 
-# ---------------- Helper Functions ----------------
-def calculate_bmr(weight, height, age, gender):
-    """Mifflin-St Jeor formula"""
-    if gender.lower() == "male":
-        return 10*weight + 6.25*height - 5*age + 5
-    else:
-        return 10*weight + 6.25*height - 5*age - 161
-
-def activity_multiplier(activity):
-    return {
-        "Sedentary": 1.2,
-        "Lightly Active": 1.375,
-        "Moderately Active": 1.55,
-        "Very Active": 1.725,
-        "Extra Active": 1.9
-    }.get(activity, 1.2)
-
-def calculate_macros(tdee):
-    return {
-        "Protein": f"{int(tdee*0.25/4)} g/day",
-        "Carbs": f"{int(tdee*0.50/4)} g/day",
-        "Fat": f"{int(tdee*0.25/9)} g/day",
-        "Fiber": f"{int(14 * tdee / 1000)} g/day",
-        "Sugar (limit)": f"{int(tdee*0.10/4)} g/day"
-    }
-
 # ---------------- Main UI ----------------
 st.title("📊 Body Metrics & Calorie Needs")
 
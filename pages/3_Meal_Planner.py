@@ -1,39 +1,52 @@
 import streamlit as st
+from session_memory import track, memory_panel
 import pandas as pd
-import numpy as np
+import uuid
+import db
+from store import get_store
+from lazy import lazy_import
+from nutrition import macro_targets, scale_plan, plan_totals
+from recipes import RECIPE_CATEGORY, composition, normalise, recipe_rows, recipe_swaps
+
+# SciPy and the KD-tree are only needed once someone asks for similar foods
+similarity = lazy_import("similarity")
 
 st.set_page_config(page_title="Meal Planner", layout="wide")
+track()
+memory_panel()
 
 # -------------------- Load Data --------------------
-DATA_URL = "https://drive.google.com/uc?export=download&id=1SjGNAij9o5q4V_62qfMkcjFegQvj5Ij2"
+store = get_store()
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv(DATA_URL)
-    # Convert key nutrient columns to numeric
-    for c in ["Calories (kcal)", "Protein (g)", "Carbs (g)", "Fat (g)", "Fiber (g)", "Sugar (g)"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df
+# Map columns dynamically (case-insensitive)
+colmap = {
+    "food": [c for c in store.columns if "food" in c.lower()][0],
+    "category": [c for c in store.columns if "category" in c.lower()][0],
+    "calories": [c for c in store.columns if "calorie" in c.lower()][0],
+    "protein": [c for c in store.columns if "protein" in c.lower()][0],
+    "carbs": [c for c in store.columns if "carb" in c.lower()][0],
+    "fat": [c for c in store.columns if "fat" in c.lower()][0],
+    "fiber": [c for c in store.columns if "fiber" in c.lower()][0],
+    "sugar": [c for c in store.columns if "sugar" in c.lower()][0],
+}
 
-df = load_data()
+# recipes come back with the catalog's canonical column names
+recipe_cols = {
+    "Food": colmap["food"], "Category": colmap["category"],
+    "Calories (kcal)": colmap["calories"], "Protein (g)": colmap["protein"],
+    "Carbs (g)": colmap["carbs"], "Fat (g)": colmap["fat"],
+    "Fiber (g)": colmap["fiber"], "Sugar (g)": colmap["sugar"],
+}
 
-catalog = load_data()
+# The item picker only ever lists this many matches; narrow with search/category
+PICKER_LIMIT = 500
 
-# normalize column names (lowercase)
-catalog.columns = [c.strip().lower() for c in catalog.columns]
+# One bound for every grams input: portions × quantity, saved and imported plans
+# all land in this range (values outside it are clamped, never rejected)
+GRAMS_MIN, GRAMS_MAX = 1.0, 5000.0
 
-# Map columns dynamically
-colmap = {
-    "food": [c for c in catalog.columns if "food" in c][0],
-    "category": [c for c in catalog.columns if "category" in c][0],
-    "calories": [c for c in catalog.columns if "calorie" in c][0],
-    "protein": [c for c in catalog.columns if "protein" in c][0],
-    "carbs": [c for c in catalog.columns if "carb" in c][0],
-    "fat": [c for c in catalog.columns if "fat" in c][0],
-    "fiber": [c for c in catalog.columns if "fiber" in c][0],
-    "sugar": [c for c in catalog.columns if "sugar" in c][0],
-}
+def clamp_grams(g):
+    return float(min(max(float(g), GRAMS_MIN), GRAMS_MAX))
 
 # -------------------- Sidebar --------------------
 st.sidebar.header("⚙️ Preferences")
@@ -51,11 +64,12 @@ st.sidebar.metric("🔥 Daily Calorie Target", f"{int(daily_kcal)} kcal")
 
 # Recommended macros
 st.sidebar.markdown("### 🎯 Recommended Intake")
-protein_target = int(daily_kcal * 0.25 / 4)
-carb_target = int(daily_kcal * 0.50 / 4)
-fat_target = int(daily_kcal * 0.25 / 9)
-fiber_target = int(14 * daily_kcal / 1000)
-sugar_target = int(daily_kcal * 0.10 / 4)
+targets = macro_targets(daily_kcal)
+protein_target = targets["Protein"]
+carb_target = targets["Carbs"]
+fat_target = targets["Fat"]
+fiber_target = targets["Fiber"]
+sugar_target = targets["Sugar"]
 
 st.sidebar.write(f"💪 Protein: {protein_target} g/day")
 st.sidebar.write(f"🍞 Carbs: {carb_target} g/day")
@@ -70,84 +84,242 @@ if st.sidebar.button("🧹 Clear My Plan"):
     st.session_state.cart = []
     st.rerun()
 
-# -------------------- Filter diet type --------------------
-filtered_catalog = catalog.copy()
-
-if diet_pref in ["Vegetarian", "Vegan"]:
-    nonveg_keywords = [
-        "meat","fish","pork","chicken","beef","turkey","lamb","goat",
-        "duck","veal","shellfish","crab","lobster","shrimp","oyster",
-        "clam","anchovy","tuna","salmon","mackerel","sardine"
-    ]
-    pattern = "|".join(nonveg_keywords)
-    filtered_catalog = filtered_catalog[
-        ~filtered_catalog[colmap["category"]].str.contains(pattern, case=False, na=False) &
-        ~filtered_catalog[colmap["food"]].str.contains(pattern, case=False, na=False)
-    ]
-
-if diet_pref == "Vegan":
-    vegan_exclude = ["milk","cheese","butter","yogurt","cream","egg"]
-    pattern_vegan = "|".join(vegan_exclude)
-    filtered_catalog = filtered_catalog[
-        ~filtered_catalog[colmap["category"]].str.contains(pattern_vegan, case=False, na=False) &
-        ~filtered_catalog[colmap["food"]].str.contains(pattern_vegan, case=False, na=False)
-    ]
+# Logged-in users can keep their plan in the database between sessions
+user_id = (st.session_state.get("user_profile") or {}).get("id") if st.session_state.get("logged_in") else None
+
+# Recipes: {id: {"name", "ingredients": [(fdc_id, grams), ...]}}. Saved ones (int ids)
+# are loaded once per login; session-only ones (str ids) built before logging in are
+# saved to the account at that point, and plan entries using them follow the new id.
+if st.session_state.get("recipes_user", "none") != user_id or "recipes" not in st.session_state:
+    anonymous = {rid: r for rid, r in st.session_state.get("recipes", {}).items() if isinstance(rid, str)}
+    recipes = db.load_recipes(user_id) if user_id is not None else {}
+    moved = {}
+    for rid, recipe in anonymous.items():
+        new_id = db.save_recipe(user_id, recipe["name"], recipe["ingredients"]) if user_id is not None else None
+        if new_id is None:
+            recipes[rid] = recipe
+        else:
+            recipes[new_id] = recipe
+            moved[rid] = new_id
+    for item in st.session_state.cart:
+        if item.get("recipe") in moved:
+            item["recipe"] = moved[item["recipe"]]
+    if moved:
+        st.sidebar.info(f"🍳 Saved {len(moved)} recipe(s) you built before logging in to your account.")
+    st.session_state.recipes = recipes
+    st.session_state.recipes_user = user_id
+
+if user_id is not None:
+    colS, colL = st.sidebar.columns(2)
+    if colS.button("💾 Save Plan", disabled=not st.session_state.cart):
+        saveable, left_out = [], []
+        for item in st.session_state.cart:
+            if "fdc_id" in item or isinstance(item.get("recipe"), int):
+                saveable.append(item)
+            else:
+                left_out.append(st.session_state.recipes.get(item.get("recipe"), {}).get("name", "unknown recipe"))
+        if db.save_meal_plan(user_id, saveable):
+            st.sidebar.success("Plan saved.")
+            if left_out:
+                st.sidebar.warning("Not saved (recipes kept only for this session): " + ", ".join(left_out))
+        else:
+            st.sidebar.error("⚠️ Could not save your plan.")
+    if colL.button("📂 Load Plan"):
+        st.session_state.cart = db.load_meal_plan(user_id)
+        st.rerun()
+
+# -------------------- Cached Queries --------------------
+# Keyed on catalog version + inputs: a full rerun only re-queries what changed
+@st.cache_data(max_entries=64, show_spinner=False)
+def diet_categories(version, diet):
+    return store.categories(diet=diet)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def picker_options(version, diet, cats, term):
+    # diet, category and search filters run inside the catalog store
+    return store.search(diet=diet, categories=list(cats), term=term,
+                        limit=PICKER_LIMIT, columns=[colmap["food"]])
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def swaps_for(version, max_kcal, min_protein, diet):
+    return store.swaps(max_kcal, min_protein, diet=diet, limit=3)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def cart_foods(version, fdc_ids):
+    return store.get_many(fdc_ids)
+
+def _cart_key(item):
+    return f"r{item['recipe']}" if "recipe" in item else f"f{item['fdc_id']}"
+
+def plan_frame(cart):
+    """The cart holds only fdc_id (or recipe) / Meal / Grams; names and nutrients come from the store"""
+    foods = cart_foods(store.version, tuple(sorted({item["fdc_id"] for item in cart if "fdc_id" in item})))
+    # a recipe is one cached per-100 g row, however many ingredients it has
+    in_cart = {item["recipe"] for item in cart if "recipe" in item}
+    dishes = recipe_rows(store, {r: v for r, v in st.session_state.recipes.items() if r in in_cart})
+    foods = foods.set_axis([f"f{i}" for i in foods.index])
+    if not dishes.empty:
+        foods = pd.concat([foods, dishes.rename(columns=recipe_cols).set_axis([f"r{r}" for r in dishes.index])])
+    foods = foods.reindex([_cart_key(item) for item in cart])
+    return pd.DataFrame({
+        "fdc_id": [item.get("fdc_id") for item in cart],
+        "Meal": [item["Meal"] for item in cart],
+        "Food": foods[colmap["food"]].fillna("(no longer available)").to_numpy(),
+        "Category": foods[colmap["category"]].fillna("").to_numpy(),
+        "Grams": [item["Grams"] for item in cart],
+        "Calories": foods[colmap["calories"]].to_numpy(),
+        "Protein": foods[colmap["protein"]].to_numpy(),
+        "Carbs": foods[colmap["carbs"]].to_numpy(),
+        "Fat": foods[colmap["fat"]].to_numpy(),
+        "Fiber": foods[colmap["fiber"]].to_numpy(),
+        "Sugar": foods[colmap["sugar"]].to_numpy(),
+    })
 
 # -------------------- Main Page --------------------
 st.title("🍽️ Meal Planner")
 st.caption("Plan your meals, track macros, and discover healthy swaps.")
 
-colA, colB, colC, colD = st.columns([1.2, 1.2, 1.2, 1])
-categories = sorted(filtered_catalog[colmap["category"]].dropna().unique().tolist())
-
-with colA:
-    pick_cats = st.multiselect("📂 Filter by Category", categories)
-with colB:
-    search = st.text_input("🔍 Search Food")
-with colC:
-    meal = st.selectbox("🍴 Assign to Meal", ["Breakfast", "Lunch", "Dinner", "Snack"])
-with colD:
-    grams = st.number_input("⚖️ Grams", 10, 1000, 100, step=10)
-
-f = filtered_catalog.copy()
-if pick_cats:
-    f = f[f[colmap["category"]].isin(set(pick_cats))]
-if search:
-    f = f[f[colmap["food"]].str.contains(search, case=False, na=False)]
-
-sel = st.selectbox("🍲 Choose an Item", options=f[colmap["food"]] if not f.empty else ["(no items)"], index=0)
-
-if st.button("➕ Add to Plan", use_container_width=True, disabled=(f.empty or sel == "(no items)")):
-    row = catalog[catalog[colmap["food"]] == sel].iloc[0].to_dict()
-    row_out = {
-        "Meal": meal,
-        "Food": row[colmap["food"]],
-        "Category": row.get(colmap["category"], ""),
-        "Grams": grams,
-        "Calories": row.get(colmap["calories"], np.nan),
-        "Protein": row.get(colmap["protein"], np.nan),
-        "Carbs": row.get(colmap["carbs"], np.nan),
-        "Fat": row.get(colmap["fat"], np.nan),
-        "Fiber": row.get(colmap["fiber"], np.nan),
-        "Sugar": row.get(colmap["sugar"], np.nan),
-    }
-    st.session_state.cart.append(row_out)
-    st.success(f"✅ Added: {row_out['Food']} ({grams} g) to {meal}")
-    st.rerun()
-
-# -------------------- Current Plan --------------------
-if st.session_state.cart:
+# Each section below is a fragment: interacting with its widgets reruns only that
+# section. Inputs from the sidebar are passed in explicitly; anything that changes
+# the cart triggers a full rerun, since the plan and swaps depend on it.
+
+@st.fragment
+def item_picker(diet):
+    track()  # fragment reruns skip the page top; keep the session marked active
+    colA, colB, colC, colD = st.columns([1.2, 1.2, 1.2, 1])
+    categories = diet_categories(store.version, diet)
+    if st.session_state.recipes:
+        categories = [RECIPE_CATEGORY] + categories
+
+    with colA:
+        pick_cats = st.multiselect("📂 Filter by Category", categories)
+    with colB:
+        search = st.text_input("🔍 Search Food")
+    with colC:
+        meal = st.selectbox("🍴 Assign to Meal", ["Breakfast", "Lunch", "Dinner", "Snack"])
+    with colD:
+        grams = st.number_input("⚖️ Grams", GRAMS_MIN, GRAMS_MAX, 100.0, step=10.0)
+
+    food_cats = [c for c in pick_cats if c != RECIPE_CATEGORY]
+    if pick_cats and not food_cats:
+        f = pd.DataFrame(columns=[colmap["food"]])
+    else:
+        f = picker_options(store.version, diet, tuple(food_cats), search)
+    if len(f) == PICKER_LIMIT:
+        st.caption(f"Showing the first {PICKER_LIMIT} matches — refine your search to see more.")
+    # the user's recipes (matching diet / search) are listed first
+    if not pick_cats or RECIPE_CATEGORY in pick_cats:
+        r = recipe_rows(store, st.session_state.recipes, diet=diet, term=search)
+    else:
+        r = pd.DataFrame(columns=["Food"])
+
+    options = [("recipe", rid) for rid in r.index] + f.index.tolist()
+    sel = st.selectbox("🍲 Choose an Item", options=options or ["(no items)"], index=0,
+                       format_func=lambda i: f"🍳 {r.at[i[1], 'Food']}" if isinstance(i, tuple)
+                       else f.at[i, colmap["food"]] if i in f.index else i)
+    is_recipe = isinstance(sel, tuple)
+
+    # Household measures ("1 cup", "1 medium") from the precomputed portion table
+    portions = store.portions(sel) if options and not is_recipe else {}
+    if portions:
+        colP, colQ = st.columns([2, 1])
+        with colP:
+            portion = st.selectbox("🥄 Portion", ["⚖️ Grams (above)"] + list(portions))
+        with colQ:
+            qty = st.number_input("Quantity", 0.25, 20.0, 1.0, step=0.25, disabled=portion not in portions)
+        if portion in portions:
+            grams = clamp_grams(round(qty * portions[portion], 1))
+            st.caption(f"= {grams:g} g")
+
+    if st.button("➕ Add to Plan", use_container_width=True, disabled=not options):
+        # keep the session small: the plan is rebuilt from the store on render
+        if is_recipe:
+            st.session_state.cart.append({"recipe": sel[1], "Meal": meal, "Grams": grams})
+        else:
+            st.session_state.cart.append({"fdc_id": int(sel), "Meal": meal, "Grams": grams})
+        name = r.at[sel[1], "Food"] if is_recipe else f.at[sel, colmap["food"]]
+        st.success(f"✅ Added: {name} ({grams} g) to {meal}")
+        st.rerun()
+
+    if options and not is_recipe and st.toggle("🔎 Foods like this", key="sim_on"):
+        sim_k = st.slider("How many", 1, 20, 5, key="sim_k")
+        similar = similarity.get_index(store).similar_frame(sel, sim_k, diet=diet, categories=pick_cats or None)
+        st.dataframe(similar, use_container_width=True)
+
+
+@st.fragment
+def recipe_builder():
+    track()
+    with st.expander("🍳 My Recipes — build a dish once, then add it like any food"):
+        draft = st.session_state.setdefault("recipe_draft", [])
+
+        colI, colG = st.columns([3, 1])
+        with colI:
+            term = st.text_input("🔍 Find Ingredient", key="rb_term")
+            opts = picker_options(store.version, None, (), term)
+            ing = st.selectbox("🥕 Ingredient", opts.index.tolist() or ["(no items)"], key="rb_item",
+                               format_func=lambda i: opts.at[i, colmap["food"]] if i in opts.index else i)
+        with colG:
+            ing_g = st.number_input("Grams", 1, 2000, 100, step=5, key="rb_grams")
+
+        colA, colP, colC = st.columns(3)
+        if colA.button("➕ Add Ingredient", disabled=opts.empty):
+            draft.append((int(ing), float(ing_g)))
+        if colP.button("📋 Use Current Plan", disabled=not st.session_state.cart):
+            draft[:] = [(item["fdc_id"], float(item["Grams"])) for item in st.session_state.cart if "fdc_id" in item]
+        if colC.button("🧹 Clear Draft", disabled=not draft):
+            draft.clear()
+
+        if draft:
+            names = cart_foods(store.version, tuple(sorted({i for i, _ in draft})))
+            st.dataframe(pd.DataFrame({
+                "Ingredient": [names.at[i, colmap["food"]] if i in names.index else i for i, _ in draft],
+                "Grams": [g for _, g in draft],
+            }), use_container_width=True, hide_index=True)
+            comp = composition(store, draft)
+            n = comp["nutrients"]
+            st.caption(f"{comp['grams']:.0f} g total · per 100 g: {n['Calories (kcal)']:.0f} kcal, "
+                       f"{n['Protein (g)']:.1f} g protein, {n['Carbs (g)']:.1f} g carbs, {n['Fat (g)']:.1f} g fat")
+
+            name = st.text_input("Recipe Name", key="rb_name")
+            if st.button("💾 Save Recipe", disabled=not name.strip()):
+                ingredients = list(normalise(draft))
+                # saved to the account when logged in, otherwise kept for this session
+                if user_id is not None:
+                    rid = db.save_recipe(user_id, name, ingredients)
+                else:
+                    rid = f"s-{uuid.uuid4().hex[:8]}"
+                if rid is None:
+                    st.error("⚠️ Could not save your recipe.")
+                else:
+                    st.session_state.recipes[rid] = {"name": name.strip(), "ingredients": ingredients}
+                    draft.clear()
+                    st.rerun()
+
+        if st.session_state.recipes:
+            st.markdown("**Saved recipes** (per 100 g)")
+            st.dataframe(recipe_rows(store, st.session_state.recipes).round(1), use_container_width=True,
+                         hide_index=True)
+            rid = st.selectbox("Recipe", list(st.session_state.recipes), key="rb_pick",
+                               format_func=lambda r: st.session_state.recipes[r]["name"])
+            if st.button("🗑️ Delete Recipe"):
+                if isinstance(rid, int) and user_id is not None:
+                    db.delete_recipe(user_id, rid)
+                del st.session_state.recipes[rid]
+                st.session_state.cart = [item for item in st.session_state.cart if item.get("recipe") != rid]
+                st.rerun()
+
+
+@st.fragment
+def current_plan(daily_kcal, df_plan):
+    track()
     st.markdown("## 📋 Current Plan")
-    df_plan = pd.DataFrame(st.session_state.cart)
-
-    # scale nutrients
-    factor = df_plan["Grams"].astype(float) / 100.0
-    for c in ["Calories","Protein","Carbs","Fat","Fiber","Sugar"]:
-        df_plan[c] = pd.to_numeric(df_plan[c], errors="coerce") * factor
 
     st.dataframe(df_plan, use_container_width=True)
+    st.download_button("⬇️ Download Plan (CSV)", df_plan.to_csv(index=False).encode("utf-8"),
+                       file_name="meal_plan.csv", mime="text/csv")
 
-    totals = df_plan[["Calories","Protein","Carbs","Fat","Fiber","Sugar"]].sum()
+    totals = plan_totals(df_plan)
 
     st.progress(min(totals["Calories"]/daily_kcal, 1.0),
                 text=f"🔥 {totals['Calories']:.0f} / {daily_kcal} kcal")
@@ -161,12 +333,13 @@ if st.session_state.cart:
 
     # Manage entries
     st.markdown("### 🛠️ Manage Entries")
-    names = [f"{r['Meal']}: {r['Food']} ({r['Grams']} g)" for r in st.session_state.cart]
+    names = [f"{r.Meal}: {r.Food} ({r.Grams} g)" for r in df_plan.itertuples(index=False)]
     sel_idx = st.selectbox("Select Item", options=list(range(len(names))), format_func=lambda i: names[i])
 
     colx, coly, colz = st.columns([1,1,1])
     with colx:
-        new_g = st.number_input("Update Grams", 10, 1000, value=int(st.session_state.cart[sel_idx]["Grams"]), step=10)
+        new_g = st.number_input("Update Grams", GRAMS_MIN, GRAMS_MAX,
+                                value=clamp_grams(st.session_state.cart[sel_idx]["Grams"]), step=10.0)
         if st.button("🔄 Update Grams"):
             st.session_state.cart[sel_idx]["Grams"] = new_g
             st.rerun()
@@ -181,7 +354,9 @@ if st.session_state.cart:
             st.session_state.cart.pop(sel_idx)
             st.rerun()
 
-        # -------------------- Healthy Swaps --------------------
+
+def healthy_swaps(diet, df_plan):
+    """No widgets of its own; per-item swap queries are memoised, so unchanged items cost nothing"""
     st.markdown("## 🥦 Healthy Swaps")
 
     swaps_found = False
@@ -191,11 +366,13 @@ if st.session_state.cart:
         chosen_kcal = chosen.get("Calories", 0)
         chosen_protein = chosen.get("Protein", 0)
 
-        better = filtered_catalog[
-    (filtered_catalog[colmap["calories"]] <= chosen_kcal) &
-    (filtered_catalog[colmap["protein"]] >= chosen_protein)
-].sort_values(colmap["calories"]).head(3)
-
+        better = swaps_for(store.version, chosen_kcal, chosen_protein, diet)
+        # the user's own recipes compete with catalog foods under the same rule
+        mine = recipe_swaps(store, st.session_state.recipes, chosen_kcal, chosen_protein, diet=diet,
+                            exclude=st.session_state.cart[i].get("recipe"))
+        if not mine.empty:
+            better = (pd.concat([better, mine.rename(columns=recipe_cols)])
+                      .sort_values(colmap["calories"]).head(3))
 
         if not better.empty:
             swaps_found = True
@@ -218,3 +395,13 @@ if st.session_state.cart:
     if not swaps_found:
         st.info("✅ All your chosen foods are already healthy choices!")
 
+
+item_picker(diet_pref)
+recipe_builder()
+
+if st.session_state.cart:
+    # built once per full run and shared; every cart change reruns the whole page,
+    # so the plan a fragment rerun sees is never stale
+    df_plan = scale_plan(plan_frame(st.session_state.cart))
+    current_plan(daily_kcal, df_plan)
+    healthy_swaps(diet_pref, df_plan)
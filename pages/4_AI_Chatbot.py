@@ -1,15 +1,25 @@
 # pages/4_AI_Chatbot.py
 import streamlit as st
-from openai import OpenAI
+from session_memory import track, memory_panel
 import os
 from dotenv import load_dotenv
+from lazy import lazy_import, lazy_resource
+
+# openai and the catalog store are only loaded when actually needed
+openai = lazy_import("openai")
+store = lazy_import("store")
 
 load_dotenv()  # only needed locally
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+@lazy_resource
+def get_client():
+    return openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 # ----------------- Config -----------------
 st.set_page_config(page_title="AI Nutrition Chatbot", layout="wide")
+track()
+memory_panel()
 st.markdown("<h1 style='text-align: center;'>🤖 AI Nutrition Assistant</h1>", unsafe_allow_html=True)
 st.markdown("<p style='text-align: center; color: gray;'>Chat naturally about your diet, nutrition & healthy swaps</p>", unsafe_allow_html=True)
 st.markdown("---")
@@ -30,6 +40,24 @@ else:
     user_context = "The user is not logged in, so no personal details are available."
     greeting = "👋 Hello! How can I help you with your nutrition and health today?"
 
+# ----------------- Meal Plan Context -----------------
+# Cart entries carry fdc_id; resolve them with one keyed lookup instead of name matching
+plan_items = [item for item in st.session_state.get("cart", []) if "fdc_id" in item]
+recipes = st.session_state.get("recipes", {})
+plan_recipes = [item for item in st.session_state.get("cart", []) if item.get("recipe") in recipes]
+if plan_items or plan_recipes:
+    foods = store.get_store().get_many([item["fdc_id"] for item in plan_items])
+    plan_lines = [
+        f"- {item['Meal']}: {foods.at[item['fdc_id'], 'Food']} ({item['Grams']} g, "
+        f"{foods.at[item['fdc_id'], 'Calories (kcal)']:.0f} kcal per 100 g)"
+        for item in plan_items if item["fdc_id"] in foods.index
+    ]
+    plan_lines += [
+        f"- {item['Meal']}: home-made recipe \"{recipes[item['recipe']]['name']}\" ({item['Grams']} g)"
+        for item in plan_recipes
+    ]
+    user_context += "\nTheir current meal plan:\n" + "\n".join(plan_lines)
+
 # ----------------- Chat State -----------------
 if "chat_history" not in st.session_state:
     # Initialize chat with greeting
@@ -43,7 +71,10 @@ else:
 st.subheader("💬 Chat")
 
 for sender, msg in st.session_state["chat_history"]:
-    if sender == "You":
+    if sender == "Summary":
+        # older turns folded away by session_memory.compact_chat
+        st.caption(f"🗂️ {msg}")
+    elif sender == "You":
         st.markdown(
             f"<div style='background-color:#DCF8C6; padding:10px; border-radius:10px; margin:5px 0; text-align:right;'>"
             f"<b>🧑 You:</b> {msg}</div>",
@@ -68,13 +99,14 @@ if user_input:
     st.session_state["chat_history"].append(("You", user_input))
 
     try:
-        completion = client.chat.completions.create(
+        completion = get_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a friendly nutrition assistant."},
                 {"role": "system", "content": user_context},
                 *[
-                    {"role": "user" if s == "You" else "assistant", "content": m}
+                    {"role": "system", "content": f"Summary of earlier conversation: {m}"} if s == "Summary"
+                    else {"role": "user" if s == "You" else "assistant", "content": m}
                     for s, m in st.session_state["chat_history"]
                 ],
             ]
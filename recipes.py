@@ -0,0 +1,82 @@
+# recipes.py — user-defined recipes and their cached per-100 g nutrients
+#
+# A recipe is a name plus an ingredient list of (fdc_id, grams). Its nutrients are
+# composed once per (catalog version, ingredient list) and shared across sessions,
+# so a recipe behaves like a single catalog food in the planner: one cart entry,
+# one cached lookup, however many ingredients it has.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from catalog import DIETS, NUTRIENT_COLS, diet_mask
+
+# pseudo-category under which recipes appear next to the catalog's categories
+RECIPE_CATEGORY = "My Recipes"
+
+
+def normalise(ingredients) -> tuple:
+    """((fdc_id, grams), ...) sorted, with repeated foods merged — the recipe's cache key"""
+    merged = {}
+    for fdc_id, grams in ingredients:
+        merged[int(fdc_id)] = merged.get(int(fdc_id), 0.0) + float(grams)
+    return tuple(sorted((i, g) for i, g in merged.items() if g > 0))
+
+
+def compose(foods: pd.DataFrame, ingredients: tuple) -> dict:
+    """Per-100 g nutrients of the mix (by raw ingredient weight) and the diets it fits.
+
+    `foods` are the ingredients' catalog rows indexed by fdc_id; ingredients no longer
+    in the catalog are left out and listed under "missing".
+    """
+    present = [(i, g) for i, g in ingredients if i in foods.index]
+    rows = foods.loc[[i for i, _ in present]]
+    grams = np.array([g for _, g in present], dtype=float)
+    total = grams.sum()
+
+    values = rows.reindex(columns=NUTRIENT_COLS).to_numpy(dtype=float)
+    if total > 0:
+        per100 = np.nansum(values * grams[:, None], axis=0) / total
+    else:
+        per100 = np.full(len(NUTRIENT_COLS), np.nan)
+
+    return {
+        "nutrients": dict(zip(NUTRIENT_COLS, per100.tolist())),
+        "grams": float(total),
+        "foods": rows["Food"].astype(str).tolist() if "Food" in rows else [],
+        "diets": {d: bool(diet_mask(rows, d).all()) for d in DIETS} if len(rows) else dict.fromkeys(DIETS, True),
+        "missing": [i for i, _ in ingredients if i not in foods.index],
+    }
+
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def _composition(version: str, ingredients: tuple, _store) -> dict:
+    return compose(_store.get_many([i for i, _ in ingredients]), ingredients)
+
+
+def composition(store, ingredients) -> dict:
+    """Cached per catalog version and ingredient list — editing a recipe changes its key"""
+    return _composition(store.version, normalise(ingredients), store)
+
+
+def recipe_rows(store, recipes: dict, diet=None, term=None) -> pd.DataFrame:
+    """Recipes as catalog-shaped rows (Food, Category, nutrients) indexed by recipe id"""
+    rows = {}
+    for rid, recipe in recipes.items():
+        comp = composition(store, recipe["ingredients"])
+        if diet and not comp["diets"].get(diet, True):
+            continue
+        if term:
+            haystack = [recipe["name"]] + comp["foods"]
+            if not any(term.lower() in h.lower() for h in haystack):
+                continue
+        rows[rid] = {"Food": recipe["name"], "Category": RECIPE_CATEGORY, **comp["nutrients"]}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["Food", "Category"] + NUTRIENT_COLS)
+
+
+def recipe_swaps(store, recipes: dict, max_kcal: float, min_protein: float, diet=None, limit=3,
+                 exclude=None) -> pd.DataFrame:
+    """Same rule as CatalogStore.swaps, applied to the user's recipes (except `exclude`,
+    the recipe being swapped out)"""
+    rows = recipe_rows(store, {rid: r for rid, r in recipes.items() if rid != exclude}, diet=diet)
+    rows = rows[(rows["Calories (kcal)"] <= max_kcal) & (rows["Protein (g)"] >= min_protein)]
+    return rows.sort_values("Calories (kcal)").head(limit)
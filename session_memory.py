@@ -0,0 +1,206 @@
+# session_memory.py — per-session memory accounting, caps & idle-state eviction
+import os
+import pickle
+import sys
+import threading
+import time
+
+import streamlit as st
+
+# -----------------------------------------------------
+# CONFIG
+# -----------------------------------------------------
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "20"))           # messages kept verbatim
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "900"))
+SWEEP_INTERVAL_SECONDS = 60
+EVICT_DIR = os.getenv("SESSION_EVICT_DIR", os.path.join("data", "sessions"))
+SHOW_MEMORY_PANEL = os.getenv("SESSION_MEMORY_PANEL", "") == "1"
+
+# large, rebuildable state that may leave memory while a tab sits idle
+EVICTABLE_KEYS = ["chat_history", "cart", "recipes", "recipe_draft"]
+
+# the only users columns the pages need (never the password hash)
+PROFILE_FIELDS = ["id", "username", "email", "weight", "height", "age", "gender", "activity"]
+
+
+# -----------------------------------------------------
+# ACCOUNTING
+# -----------------------------------------------------
+def _size(value) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def state_sizes(state=None) -> dict:
+    """{key: approximate bytes} for every session-state key, largest first"""
+    state = st.session_state if state is None else state
+    sizes = {str(k): _size(state[k]) for k in list(state.keys())}
+    return dict(sorted(sizes.items(), key=lambda kv: -kv[1]))
+
+
+def slim_profile(user: dict) -> dict:
+    """Keep only the profile fields the pages use"""
+    return {k: user.get(k) for k in PROFILE_FIELDS}
+
+
+SUMMARY_PREFIX = "Earlier the user asked about: "
+SUMMARY_MAX_CHARS = 1500
+
+
+def compact_chat(history: list, max_turns: int = CHAT_MAX_TURNS) -> list:
+    """Fold everything but the greeting and the last `max_turns` messages into one summary entry"""
+    head = history[:1]
+    body = history[1:]
+    topics = []
+    if body and body[0][0] == "Summary":
+        previous = body[0][1]
+        if previous.startswith(SUMMARY_PREFIX):
+            previous = previous[len(SUMMARY_PREFIX):]
+        topics = [previous] if previous else []
+        body = body[1:]
+    if len(body) <= max_turns:
+        return history
+
+    old, recent = body[:-max_turns], body[-max_turns:]
+    topics += [m if len(m) <= 80 else m[:77] + "…" for s, m in old if s == "You"]
+    if not topics:
+        return head + recent
+    # one prefix however often the chat is compacted; the oldest topics go first
+    text = "; ".join(topics)[-(SUMMARY_MAX_CHARS - len(SUMMARY_PREFIX)):]
+    return head + [("Summary", SUMMARY_PREFIX + text)] + recent
+
+
+# -----------------------------------------------------
+# IDLE EVICTION
+# -----------------------------------------------------
+# session_id → [last_seen, SessionState, lock]. The state is held strongly: the
+# SafeSessionState wrapper in the script context is rebuilt for every run, so it
+# cannot tell a finished run from a closed tab. Sessions are forgotten only once
+# the runtime reports them disconnected.
+_sessions = {}
+_lock = threading.Lock()
+_sweeper = None
+
+
+def _evict_path(session_id: str) -> str:
+    return os.path.join(EVICT_DIR, f"{session_id}.pkl")
+
+
+def _evict(session_id: str, state):
+    payload = {k: state[k] for k in EVICTABLE_KEYS if k in state}
+    if not payload:
+        return
+    os.makedirs(EVICT_DIR, exist_ok=True)
+    tmp = _evict_path(session_id) + ".tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, _evict_path(session_id))
+    for k in payload:
+        del state[k]
+
+
+def _restore(session_id: str, state):
+    path = _evict_path(session_id)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as fh:
+        payload = pickle.load(fh)
+    for k, v in payload.items():
+        if k not in state:
+            state[k] = v
+    os.remove(path)
+
+
+def _is_connected(session_id: str) -> bool:
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return True  # headless (AppTest): no session manager to ask
+    return Runtime.instance().is_active_session(session_id)
+
+
+def _forget(session_id: str):
+    with _lock:
+        _sessions.pop(session_id, None)
+    if os.path.exists(_evict_path(session_id)):
+        os.remove(_evict_path(session_id))
+
+
+def sweep(now=None):
+    """Evict large state of sessions idle longer than SESSION_IDLE_SECONDS"""
+    now = time.time() if now is None else now
+    with _lock:
+        items = list(_sessions.items())
+    for session_id, entry in items:
+        if not _is_connected(session_id):
+            _forget(session_id)
+            continue
+        # the per-session lock is also taken by track(), so a rerun that starts
+        # now either restores first or sees a fresh last_seen and is skipped
+        with entry[2]:
+            if now - entry[0] <= SESSION_IDLE_SECONDS:
+                continue
+            try:
+                _evict(session_id, entry[1])
+            except Exception as e:
+                print("❌ Error evicting session state:", e)
+
+
+def _sweep_forever():
+    while True:
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        sweep()
+
+
+def track():
+    """Call at the top of every page and every fragment that reads evictable state:
+    restores evicted state and marks the session active"""
+    global _sweeper
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    # the session's own SessionState, which outlives this run's wrapper
+    state = getattr(ctx.session_state, "_state", ctx.session_state)
+
+    with _lock:
+        entry = _sessions.get(ctx.session_id)
+        if entry is None:
+            entry = _sessions[ctx.session_id] = [time.time(), state, threading.Lock()]
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="session-evictor", daemon=True)
+            _sweeper.start()
+
+    with entry[2]:
+        entry[0] = time.time()
+        entry[1] = state
+        _restore(ctx.session_id, state)
+
+    if "chat_history" in st.session_state:
+        st.session_state["chat_history"] = compact_chat(st.session_state["chat_history"])
+
+
+def worker_summary() -> dict:
+    """Tracked sessions in this worker process and how many are currently idle"""
+    now = time.time()
+    with _lock:
+        seen = [entry[0] for entry in _sessions.values()]
+    return {
+        "sessions": len(seen),
+        "idle": sum(now - last > SESSION_IDLE_SECONDS for last in seen),
+    }
+
+
+def memory_panel():
+    """Sidebar expander with per-key session-state sizes (SESSION_MEMORY_PANEL=1)"""
+    if not SHOW_MEMORY_PANEL:
+        return
+    sizes = state_sizes()
+    summary = worker_summary()
+    with st.sidebar.expander(f"🧠 Session memory ({sum(sizes.values()) / 1024:.1f} KiB)"):
+        for k, b in sizes.items():
+            st.write(f"- `{k}`: {b / 1024:.1f} KiB")
+        st.caption(f"Worker: {summary['sessions']} sessions tracked, {summary['idle']} idle")
@@ -0,0 +1,126 @@
+# similarity.py — "Foods like this" nearest-neighbour search over nutrient profiles
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from catalog import NUTRIENT_COLS
+from lazy import lazy_import
+from store import DIET_COLUMNS
+
+spatial = lazy_import("scipy.spatial")
+
+# Below this many allowed rows a direct distance scan beats re-querying the tree
+BRUTE_FORCE_MAX = 2048
+
+
+class FoodIndex:
+    """KD-tree over z-scored per-100 g nutrient vectors of the catalog.
+
+    Holds only a numeric projection — float32 vectors, sorted fdc_ids, food-name
+    hashes, category codes and diet flags (~50 bytes/food plus the tree) — and
+    fetches display rows from the store per query, so no catalog text stays in memory.
+    """
+
+    def __init__(self, store, ids, name_hash, category_codes, categories, diets, X):
+        self.store = store
+        self.ids = ids                      # int64, sorted
+        self.name_hash = name_hash          # uint64, to skip same-name duplicates
+        self.category_codes = category_codes
+        self.categories = list(categories)  # code → name
+        self.diets = diets                  # diet → bool array (diets without a flag allow all)
+
+        X = np.nan_to_num(X.astype(np.float32))
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        self.vectors = (X - self.mean) / self.std
+        self.tree = spatial.cKDTree(self.vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def position(self, fdc_id) -> int:
+        pos = int(np.searchsorted(self.ids, int(fdc_id)))
+        if pos == len(self.ids) or self.ids[pos] != int(fdc_id):
+            raise KeyError(fdc_id)
+        return pos
+
+    def allowed(self, diet=None, categories=None) -> np.ndarray:
+        """Boolean mask for the optional diet-flag and category constraints"""
+        mask = np.ones(len(self), dtype=bool)
+        if diet in self.diets:
+            mask &= self.diets[diet]
+        if categories:
+            codes = [i for i, c in enumerate(self.categories) if c in set(categories)]
+            mask &= np.isin(self.category_codes, codes)
+        return mask
+
+    def similar(self, fdc_id, k: int = 5, diet=None, categories=None):
+        """Return (positions, distances) of the k foods closest to `fdc_id`"""
+        pos = self.position(fdc_id)
+        mask = self.allowed(diet, categories)
+        # never suggest the food itself (or a same-name duplicate)
+        mask &= self.name_hash != self.name_hash[pos]
+        n_allowed = int(mask.sum())
+        if n_allowed == 0:
+            return np.empty(0, dtype=int), np.empty(0)
+        k = min(k, n_allowed)
+        query = self.vectors[pos]
+
+        if n_allowed <= BRUTE_FORCE_MAX:
+            cand = np.flatnonzero(mask)
+            dist = np.linalg.norm(self.vectors[cand] - query, axis=1)
+            top = np.argpartition(dist, k - 1)[:k]
+            top = top[np.argsort(dist[top])]
+            return cand[top], dist[top]
+
+        # Over-fetch from the tree, widening until enough neighbours pass the mask
+        fetch = k + 1
+        while True:
+            fetch = min(fetch * 4, len(self))
+            dist, idx = self.tree.query(query, k=fetch)
+            keep = mask[idx]
+            if keep.sum() >= k or fetch == len(self):
+                return idx[keep][:k], dist[keep][:k]
+
+    def similar_frame(self, fdc_id, k: int = 5, diet=None, categories=None) -> pd.DataFrame:
+        """Catalog rows most similar to `fdc_id`, with a Distance column"""
+        idx, dist = self.similar(fdc_id, k, diet, categories)
+        ids = self.ids[idx]
+        rows = self.store.get_many(ids.tolist()).reindex(pd.Index(ids, name="fdc_id"))
+        out = rows[[c for c in ["Food", "Category"] + NUTRIENT_COLS if c in rows.columns]].copy()
+        out.insert(0, "Distance", np.round(dist, 3))
+        return out
+
+
+def build_index(store) -> FoodIndex:
+    """Read just the numeric projection from the store (no food names or text columns)"""
+    categories = store.categories()
+    nutrients = ", ".join(f'"{c}"' for c in NUTRIENT_COLS)
+    flags = ", ".join(f'{col} AS "{diet}"' for diet, col in DIET_COLUMNS.items())
+    df = store.query(f"""
+        SELECT fdc_id, hash(Food) AS name_hash,
+               CASE WHEN Category IS NULL THEN -1
+                    ELSE dense_rank() OVER (ORDER BY Category NULLS LAST) - 1 END AS category_code,
+               {flags}, {nutrients}
+        FROM food ORDER BY fdc_id
+    """)
+    code_dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+    return FoodIndex(
+        store,
+        ids=df["fdc_id"].to_numpy(dtype=np.int64),
+        name_hash=df["name_hash"].to_numpy(dtype=np.uint64),
+        category_codes=df["category_code"].to_numpy(dtype=code_dtype),
+        categories=categories,
+        diets={d: df[d].fillna(False).to_numpy(dtype=bool) for d in DIET_COLUMNS},
+        X=df[NUTRIENT_COLS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32),
+    )
+
+@st.cache_resource(show_spinner=False)
+def _build_index(version: str, _store) -> FoodIndex:
+    return build_index(_store)
+
+
+def get_index(store) -> FoodIndex:
+    """FoodIndex built once per catalog version and shared across sessions"""
+    return _build_index(store.version, store)
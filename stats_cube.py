@@ -0,0 +1,128 @@
+# stats_cube.py — per-category nutrient statistics, computed once per catalog version
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from catalog import NUTRIENT_COLS
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+N_BINS = 30
+
+# measure name → SQL expression over the food table
+MEASURES = {c: f'"{c}"' for c in NUTRIENT_COLS}
+MEASURES["Protein density (g/100 kcal)"] = '100 * "Protein (g)" / NULLIF("Calories (kcal)", 0)'
+
+
+class StatsCube:
+    """Category × measure counts, sums, quantiles and fixed-bin histograms as dense arrays.
+
+    counts/sums: (C, M)   quantiles: (C, M, Q)   hist: (C, M, B)   edges: (M, B + 1)
+    Counts, sums and histograms add across categories, so any selection merges in O(C).
+    """
+
+    def __init__(self, categories, measures, counts, sums, quantiles, hist, edges):
+        self.categories = list(categories)
+        self.measures = list(measures)
+        self.counts = counts
+        self.sums = sums
+        self.quantiles = quantiles
+        self.hist = hist
+        self.edges = edges
+        self._cat_pos = {c: i for i, c in enumerate(self.categories)}
+
+    def _rows(self, categories=None):
+        if not categories:
+            return np.arange(len(self.categories))
+        return np.array([self._cat_pos[c] for c in categories if c in self._cat_pos], dtype=int)
+
+    def summary(self, measure: str, categories=None) -> pd.DataFrame:
+        """Per-category count, mean and quantiles for one measure"""
+        m = self.measures.index(measure)
+        rows = self._rows(categories)
+        counts = self.counts[rows, m]
+        out = pd.DataFrame({
+            "Category": [self.categories[i] for i in rows],
+            "Count": counts,
+            "Mean": np.divide(self.sums[rows, m], counts, out=np.full(len(rows), np.nan), where=counts > 0),
+        })
+        for j, q in enumerate(QUANTILES):
+            out[f"P{int(q * 100)}"] = self.quantiles[rows, m, j]
+        return out
+
+    def merged(self, measure: str, categories=None) -> dict:
+        """Stats for the union of `categories` (all when empty)"""
+        m = self.measures.index(measure)
+        rows = self._rows(categories)
+        count = int(self.counts[rows, m].sum())
+        hist = self.hist[rows, m].sum(axis=0)
+        edges = self.edges[m]
+
+        if len(rows) == 1:
+            # exact quantiles are stored per category
+            quantiles = self.quantiles[rows[0], m]
+        elif count:
+            # interpolate the merged histogram's CDF
+            cdf = np.concatenate([[0.0], np.cumsum(hist) / count])
+            quantiles = np.interp(QUANTILES, cdf, edges)
+        else:
+            quantiles = np.full(len(QUANTILES), np.nan)
+
+        return {
+            "count": count,
+            "mean": float(self.sums[rows, m].sum() / count) if count else np.nan,
+            "quantiles": dict(zip(QUANTILES, quantiles)),
+            "hist": pd.DataFrame({"Start": edges[:-1], "End": edges[1:], "Count": hist}),
+        }
+
+
+def build_cube(store) -> StatsCube:
+    """Aggregate the catalog in the store — one pass of GROUP BY queries per measure"""
+    categories = store.categories()
+    cat_pos = {c: i for i, c in enumerate(categories)}
+    C, M, Q = len(categories), len(MEASURES), len(QUANTILES)
+    counts = np.zeros((C, M), dtype=np.int64)
+    sums = np.zeros((C, M))
+    quantiles = np.full((C, M, Q), np.nan)
+    hist = np.zeros((C, M, N_BINS), dtype=np.int64)
+    edges = np.zeros((M, N_BINS + 1))
+
+    for m, expr in enumerate(MEASURES.values()):
+        # fixed bins over [0, p99] — the top bin also collects the long tail
+        hi = store.query(f"SELECT quantile_cont({expr}, 0.99) AS hi FROM food WHERE {expr} IS NOT NULL")["hi"].iloc[0]
+        hi = float(hi) if pd.notna(hi) and hi > 0 else 1.0
+        edges[m] = np.linspace(0.0, hi, N_BINS + 1)
+        width = hi / N_BINS
+
+        per_cat = store.query(f"""
+            SELECT Category, count({expr}) AS n, sum({expr}) AS s,
+                   quantile_cont({expr}, {list(QUANTILES)}) AS q
+            FROM food WHERE Category IS NOT NULL
+            GROUP BY Category
+        """)
+        for r in per_cat.itertuples(index=False):
+            i = cat_pos[r.Category]
+            counts[i, m] = r.n
+            sums[i, m] = r.s if pd.notna(r.s) else 0.0
+            if r.n:
+                quantiles[i, m] = np.asarray(r.q, dtype=float)
+
+        bins = store.query(f"""
+            SELECT Category, least(greatest(floor(({expr}) / {width}), 0), {N_BINS - 1})::INTEGER AS b,
+                   count(*) AS n
+            FROM food WHERE Category IS NOT NULL AND {expr} IS NOT NULL
+            GROUP BY 1, 2
+        """)
+        for r in bins.itertuples(index=False):
+            hist[cat_pos[r.Category], m, r.b] = r.n
+
+    return StatsCube(categories, MEASURES, counts, sums, quantiles, hist, edges)
+
+
+@st.cache_resource(show_spinner="Summarising nutrients…")
+def _build_cube(version: str, _store) -> StatsCube:
+    return build_cube(_store)
+
+
+def get_cube(store) -> StatsCube:
+    """StatsCube built once per catalog version and shared across sessions"""
+    return _build_cube(store.version, store)
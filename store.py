@@ -0,0 +1,290 @@
+# store.py — file-backed DuckDB catalog with predicate & limit pushdown
+import os
+import glob
+import hashlib
+import threading
+import urllib.request
+import duckdb
+import pandas as pd
+import streamlit as st
+
+from catalog import DATA_URL, NUTRIENT_COLS, diet_mask
+
+# -----------------------------------------------------
+# CONFIG
+# -----------------------------------------------------
+# CATALOG_SOURCE can point at any CSV export of the ETL in usda.ipynb,
+# including one built with branded foods (Brand Owner / UPC columns are kept).
+CATALOG_SOURCE = os.getenv("CATALOG_SOURCE", DATA_URL)
+# Optional household portions table (fdc_id, Portion, Grams) — see usda.ipynb step 5
+PORTIONS_SOURCE = os.getenv("PORTIONS_SOURCE")
+CATALOG_DIR = os.getenv("CATALOG_DIR", "data")
+CHUNK_ROWS = 50_000
+# Per-connection DuckDB caps (buffer pool, worker threads); each worker opens one
+# connection. Unset threads → DuckDB's default (one per core).
+CATALOG_MEMORY_LIMIT = os.getenv("CATALOG_MEMORY_LIMIT", "256MB")
+CATALOG_THREADS = os.getenv("CATALOG_THREADS")
+
+DIET_COLUMNS = {"Vegetarian": "vegetarian", "Vegan": "vegan"}
+
+
+def _duckdb_config() -> dict:
+    config = {"memory_limit": CATALOG_MEMORY_LIMIT}
+    if CATALOG_THREADS:
+        config["threads"] = int(CATALOG_THREADS)
+    return config
+
+
+def _q(col: str) -> str:
+    """Quote a column name for SQL ("Calories (kcal)" etc.)"""
+    return '"' + col.replace('"', '""') + '"'
+
+
+# -----------------------------------------------------
+# BUILD (streams the CSV in chunks — memory is bounded by CHUNK_ROWS)
+# -----------------------------------------------------
+def build_store(source: str, path: str, portions_source=None) -> str:
+    """Load `source` (and optional portions) into a DuckDB file at `path`; returns the catalog version"""
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    digest = hashlib.sha1()
+    con = duckdb.connect(tmp_path, config=_duckdb_config())
+    try:
+        first_chunk = True
+        for chunk in pd.read_csv(source, chunksize=CHUNK_ROWS):
+            # fdc_id is the primary key that meal plans and recipes are saved
+            # against — row numbers would silently change meaning on a rebuild
+            if "fdc_id" not in chunk.columns:
+                raise ValueError(
+                    f"❌ Catalog source {source!r} has no fdc_id column. Export the catalog "
+                    "with usda.ipynb and point CATALOG_SOURCE at the resulting CSV."
+                )
+            for c in chunk.columns:
+                if c == "fdc_id":
+                    chunk[c] = chunk[c].astype("int64")
+                elif c in NUTRIENT_COLS:
+                    chunk[c] = pd.to_numeric(chunk[c], errors="coerce").astype(float)
+                else:
+                    chunk[c] = chunk[c].astype("string")
+            digest.update(pd.util.hash_pandas_object(chunk, index=False).values.tobytes())
+
+            for diet, col in DIET_COLUMNS.items():
+                chunk[col] = diet_mask(chunk, diet).to_numpy()
+
+            if first_chunk:
+                cols = ", ".join(
+                    f"{_q(c)} BIGINT" if c == "fdc_id"
+                    else f"{_q(c)} DOUBLE" if c in NUTRIENT_COLS
+                    else f"{_q(c)} BOOLEAN" if c in DIET_COLUMNS.values()
+                    else f"{_q(c)} VARCHAR"
+                    for c in chunk.columns
+                )
+                con.execute(f"CREATE TABLE food ({cols})")
+                first_chunk = False
+            con.register("chunk", chunk)
+            con.execute("INSERT INTO food SELECT * FROM chunk")
+            con.unregister("chunk")
+
+        # ART index: point lookups by fdc_id (cart, swaps, chatbot) never scan
+        con.execute("CREATE UNIQUE INDEX food_fdc_id ON food (fdc_id)")
+
+        con.execute("CREATE TABLE portion (fdc_id BIGINT, Portion VARCHAR, Grams DOUBLE)")
+        if portions_source:
+            for chunk in pd.read_csv(portions_source, chunksize=CHUNK_ROWS):
+                chunk = chunk[["fdc_id", "Portion", "Grams"]]
+                digest.update(pd.util.hash_pandas_object(chunk, index=False).values.tobytes())
+                con.register("chunk", chunk)
+                con.execute("INSERT INTO portion SELECT fdc_id, Portion, Grams FROM chunk")
+                con.unregister("chunk")
+        con.execute("CREATE INDEX portion_fdc_id ON portion (fdc_id)")
+
+        version = digest.hexdigest()[:16]
+        con.execute("CREATE TABLE meta (key VARCHAR, value VARCHAR)")
+        con.execute("INSERT INTO meta VALUES ('version', ?)", [version])
+    finally:
+        con.close()
+
+    # atomic swap so concurrent workers never open a half-built file
+    os.replace(tmp_path, path)
+    return version
+
+
+# -----------------------------------------------------
+# QUERY LAYER
+# -----------------------------------------------------
+class CatalogStore:
+    """Read-only view over the DuckDB catalog; every query filters and limits in SQL"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._con = duckdb.connect(path, read_only=True, config=_duckdb_config())
+        self.version = self._fetch("SELECT value FROM meta WHERE key = 'version'")[0][0]
+        cols = [r[0] for r in self._fetch("SELECT column_name FROM (DESCRIBE food)")]
+        # public columns — internal diet flags stay hidden
+        self.columns = [c for c in cols if c not in DIET_COLUMNS.values()]
+
+    def _cursor(self):
+        # one cursor per call: DuckDB connections are not shared across threads
+        return self._con.cursor()
+
+    def _fetch(self, sql, params=None):
+        return self._cursor().execute(sql, params or []).fetchall()
+
+    def _df(self, sql, params=None) -> pd.DataFrame:
+        return self._cursor().execute(sql, params or []).df().set_index("fdc_id")
+
+    def _where(self, diet=None, categories=None, term=None, extra=None):
+        clauses, params = [], []
+        if diet in DIET_COLUMNS:
+            clauses.append(DIET_COLUMNS[diet])
+        if categories:
+            clauses.append(f"Category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        if term:
+            clauses.append("contains(lower(Food), lower(?))")
+            params.append(term)
+        for clause, values in extra or []:
+            clauses.append(clause)
+            params.extend(values)
+        sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return sql, params
+
+    def _select(self, columns=None):
+        cols = columns or self.columns
+        if "fdc_id" not in cols:
+            cols = ["fdc_id"] + list(cols)
+        return ", ".join(_q(c) for c in cols)
+
+    def count(self, diet=None, categories=None, term=None) -> int:
+        where, params = self._where(diet, categories, term)
+        return self._fetch(f"SELECT count(*) FROM food{where}", params)[0][0]
+
+    def categories(self, diet=None) -> list:
+        where, params = self._where(diet, extra=[("Category IS NOT NULL", [])])
+        return [r[0] for r in self._fetch(f"SELECT DISTINCT Category FROM food{where} ORDER BY 1", params)]
+
+    def search(self, diet=None, categories=None, term=None, limit=None, order_by=None, columns=None) -> pd.DataFrame:
+        """Foods matching the filters, at most `limit` rows"""
+        where, params = self._where(diet, categories, term)
+        sql = f"SELECT {self._select(columns)} FROM food{where} ORDER BY {_q(order_by) if order_by else 'fdc_id'}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._df(sql, params)
+
+    def top(self, nutrient: str, k: int, category=None, term=None) -> pd.DataFrame:
+        """Top-k foods by nutrient, one row per food name (highest value kept)"""
+        where, params = self._where(
+            categories=[category] if category else None, term=term,
+            extra=[(f"{_q(nutrient)} IS NOT NULL", [])],
+        )
+        sql = f"""
+            SELECT {self._select()} FROM (
+                SELECT *, row_number() OVER (PARTITION BY Food ORDER BY {_q(nutrient)} DESC) AS _rn
+                FROM food{where}
+            ) WHERE _rn = 1
+            ORDER BY {_q(nutrient)} DESC
+            LIMIT {int(k)}
+        """
+        return self._df(sql, params)
+
+    def swaps(self, max_kcal: float, min_protein: float, diet=None, limit=3) -> pd.DataFrame:
+        """Foods with calories <= max_kcal and protein >= min_protein, lowest calories first"""
+        where, params = self._where(diet, extra=[
+            (f"{_q('Calories (kcal)')} <= ?", [float(max_kcal)]),
+            (f"{_q('Protein (g)')} >= ?", [float(min_protein)]),
+        ])
+        sql = f"SELECT {self._select()} FROM food{where} ORDER BY {_q('Calories (kcal)')} LIMIT {int(limit)}"
+        return self._df(sql, params)
+
+    def get(self, fdc_id) -> dict:
+        """Single row by fdc_id (index lookup)"""
+        rows = self._df(f"SELECT {self._select()} FROM food WHERE fdc_id = ?", [int(fdc_id)])
+        if rows.empty:
+            raise KeyError(fdc_id)
+        return rows.iloc[0].to_dict()
+
+    def get_many(self, fdc_ids) -> pd.DataFrame:
+        """Rows for a list of fdc_ids (unknown ids are simply absent)"""
+        ids = [int(i) for i in fdc_ids]
+        if not ids:
+            return self._df(f"SELECT {self._select()} FROM food LIMIT 0")
+        return self._df(f"SELECT {self._select()} FROM food WHERE fdc_id IN ({', '.join('?' * len(ids))})", ids)
+
+    def portions(self, fdc_id) -> dict:
+        """Household portions for a food as {label: grams}, smallest first"""
+        rows = self._fetch(
+            "SELECT Portion, Grams FROM portion WHERE fdc_id = ? ORDER BY Grams", [int(fdc_id)]
+        )
+        return {label: grams for label, grams in rows}
+
+    def query(self, sql, params=None) -> pd.DataFrame:
+        """Raw read-only SQL against the `food` / `portion` tables (aggregations)"""
+        return self._cursor().execute(sql, params or []).df()
+
+    def max(self, column: str) -> float:
+        return self._fetch(f"SELECT max({_q(column)}) FROM food")[0][0]
+
+
+def source_fingerprint(source):
+    """Cheap change marker for a source: size + mtime for files, ETag / Last-Modified for URLs.
+    None when a URL cannot be reached."""
+    if not source:
+        return ""
+    if os.path.exists(source):
+        stat = os.stat(source)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    if source.startswith(("http://", "https://")):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(source, method="HEAD"), timeout=10) as resp:
+                h = resp.headers
+                return h.get("ETag") or f"{h.get('Last-Modified', '')}-{h.get('Content-Length', '')}"
+        except OSError:
+            return None
+    return ""
+
+
+def open_store(source: str = CATALOG_SOURCE, portions_source=PORTIONS_SOURCE) -> CatalogStore:
+    """Open the store for the current content of `source`, building the DuckDB file when it changed"""
+    os.makedirs(CATALOG_DIR, exist_ok=True)
+    key = hashlib.sha1(f"{source}|{portions_source}".encode("utf-8")).hexdigest()[:8]
+    builds = sorted(glob.glob(os.path.join(CATALOG_DIR, f"catalog-{key}-*.duckdb")), key=os.path.getmtime)
+
+    fingerprints = [source_fingerprint(source), source_fingerprint(portions_source)]
+    if None in fingerprints:
+        if builds:
+            # offline: keep serving the last build of this source
+            return CatalogStore(builds[-1])
+        fingerprints = [fp or "" for fp in fingerprints]
+
+    # the file name follows the source's content, so an edited source is rebuilt
+    # (with a new version) instead of being served from a stale file
+    name = hashlib.sha1("|".join(fingerprints).encode("utf-8")).hexdigest()[:8]
+    path = os.path.join(CATALOG_DIR, f"catalog-{key}-{name}.duckdb")
+    if not os.path.exists(path):
+        build_store(source, path, portions_source)
+        for old in builds:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # still open elsewhere (Windows); cleaned up next time
+    return CatalogStore(path)
+
+
+@st.cache_resource(show_spinner="Preparing food catalog…")
+def _get_store(source: str, portions_source) -> CatalogStore:
+    return open_store(source, portions_source)
+
+
+def get_store(source: str = CATALOG_SOURCE, portions_source=PORTIONS_SOURCE) -> CatalogStore:
+    """One read-only store per worker process, built on first use. A source that
+    cannot be built stops the page with the reason (failures are not cached, so
+    fixing CATALOG_SOURCE and rerunning retries)."""
+    try:
+        return _get_store(source, portions_source)
+    except ValueError as e:
+        st.error(str(e))
+        st.info("The catalog needs a CSV with an `fdc_id` column: run `usda.ipynb` and start the app "
+                "with `CATALOG_SOURCE=foundation_sr.csv` (and `PORTIONS_SOURCE=portions.csv`).")
+        st.stop()
@@ -0,0 +1,44 @@
+# tests/conftest.py — shared fixtures
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# the app's modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import store as store_mod  # noqa: E402
+
+FOODS = [
+    # fdc_id, Food, Category, kcal, protein, carbs, fat, fiber, sugar
+    (1, "Apple, raw", "Fruits and Fruit Juices", 52, 0.3, 14, 0.2, 2.4, 10),
+    (2, "Chicken breast, roasted", "Poultry Products", 165, 31, 0, 3.6, 0, 0),
+    (3, "Lentils, cooked", "Legumes and Legume Products", 116, 9, 20, 0.4, 8, 1.8),
+]
+
+
+@pytest.fixture
+def make_store(tmp_path, monkeypatch):
+    """Build a CatalogStore from (fdc_id, Food, Category, *nutrients) rows"""
+    monkeypatch.setattr(store_mod, "CATALOG_DIR", str(tmp_path / "store"))
+
+    def make(rows, portions=None, name="catalog"):
+        foods = pd.DataFrame(rows, columns=["fdc_id", "Food", "Category"] + store_mod.NUTRIENT_COLS)
+        foods.to_csv(tmp_path / f"{name}.csv", index=False)
+        portions_path = None
+        if portions is not None:
+            portions_path = str(tmp_path / f"{name}-portions.csv")
+            pd.DataFrame(portions, columns=["fdc_id", "Portion", "Grams"]).to_csv(portions_path, index=False)
+        return store_mod.open_store(str(tmp_path / f"{name}.csv"), portions_path)
+
+    return make
+
+
+@pytest.fixture
+def catalog(make_store):
+    rows = FOODS + [
+        (1000 + i, f"Food item {i}", "Vegetables and Vegetable Products", 20 + i, 1, 4, 0.1, 1, 2)
+        for i in range(300)
+    ]
+    return make_store(rows, [(1, "1 medium", 182.0), (3, "1 cup", 198.0)])
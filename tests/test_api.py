@@ -0,0 +1,126 @@
+# tests/test_api.py — api.py against a store built from a small synthetic catalog
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def client(catalog, monkeypatch):
+    monkeypatch.setattr(api, "get_store", lambda: catalog)
+    api._index_for.cache_clear()
+    return TestClient(api.app)
+
+
+# -----------------------------------------------------
+# CACHING & COMPRESSION
+# -----------------------------------------------------
+def test_etag_round_trip(client):
+    first = client.get("/catalog/search", params={"q": "apple"})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    again = client.get("/catalog/search", params={"q": "apple"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+    other = client.get("/catalog/search", params={"q": "lentil"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_conditional_food_request_skips_the_lookup(client, catalog, monkeypatch):
+    etag = client.get("/catalog/foods/1").headers["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("store queried for a 304")
+
+    monkeypatch.setattr(catalog, "get_many", fail)
+    assert client.get("/catalog/foods/1", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_gzip_only_above_1kib(client):
+    big = client.get("/catalog/search", params={"limit": 300}, headers={"Accept-Encoding": "gzip"})
+    assert big.status_code == 200
+    assert big.headers.get("content-encoding") == "gzip"
+    assert len(big.json()) == 300
+
+    small = client.get("/catalog/version", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+# -----------------------------------------------------
+# ENDPOINTS
+# -----------------------------------------------------
+def test_food_includes_portions(client):
+    body = client.get("/catalog/foods/1").json()
+    assert body["fdc_id"] == 1
+    assert body["Food"] == "Apple, raw"
+    assert body["portions"] == {"1 medium": 182.0}
+
+
+def test_similar_excludes_the_food_itself(client):
+    body = client.get("/catalog/foods/3/similar", params={"k": 5}).json()
+    assert len(body) == 5
+    assert 3 not in [r["fdc_id"] for r in body]
+
+
+def test_plan_totals_with_grams_and_portions(client):
+    r = client.post("/plan/totals", json={
+        "items": [
+            {"fdc_id": 2, "grams": 150},
+            {"fdc_id": 1, "portion": "1 medium", "quantity": 2},
+        ],
+        "daily_kcal": 2000,
+    })
+    assert r.status_code == 200
+    body = r.json()
+    assert [i["Grams"] for i in body["items"]] == [150, 364]
+    assert body["totals"]["Calories"] == pytest.approx(165 * 1.5 + 52 * 3.64)
+    assert body["totals"]["Protein"] == pytest.approx(31 * 1.5 + 0.3 * 3.64)
+    assert body["kcal_progress"] == pytest.approx(body["totals"]["Calories"] / 2000)
+    assert body["targets"]["Protein"] == 125
+
+
+# -----------------------------------------------------
+# ERRORS
+# -----------------------------------------------------
+@pytest.mark.parametrize("path", ["/catalog/foods/999999", "/catalog/foods/999999/similar"])
+def test_unknown_food_is_404(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_plan_with_unknown_food_is_404(client):
+    r = client.post("/plan/totals", json={"items": [{"fdc_id": 999999, "grams": 100}]})
+    assert r.status_code == 404
+    assert "999999" in r.json()["detail"]
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("get", "/catalog/search", {"params": {"diet": "Carnivore"}}),
+    ("get", "/catalog/top", {"params": {"nutrient": "Salt (g)"}}),
+    ("get", "/catalog/search", {"params": {"limit": 0}}),
+    ("get", "/targets", {"params": {"weight": 70, "height": 175, "age": 30, "activity": "Couch"}}),
+    ("post", "/plan/totals", {"json": {"items": [{"fdc_id": 1, "portion": "1 bucket"}]}}),
+    ("post", "/plan/totals", {"json": {"items": [{"fdc_id": 1, "grams": -5}]}}),
+])
+def test_invalid_input_is_422(client, method, path, kwargs):
+    assert getattr(client, method)(path, **kwargs).status_code == 422
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('W/"v1-abc"', True),
+    ('W/"v0-xyz", W/"v1-abc"', True),
+    ("*", True),
+    ('W/"v1-abcdef"', False),
+    ('W/"v1-ab"', False),
+    ("", False),
+    (None, False),
+])
+def test_etag_matching_is_exact(header, expected):
+    assert api._etag_matches(header, 'W/"v1-abc"') is expected
+
+
+def test_wildcard_if_none_match(client):
+    assert client.get("/catalog/categories", headers={"If-None-Match": "*"}).status_code == 304
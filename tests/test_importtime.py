@@ -0,0 +1,15 @@
+# tests/test_importtime.py — every page's cold imports stay inside the startup budget
+import pytest
+
+import importtime
+
+
+@pytest.fixture(scope="module")
+def startup():
+    return set(importtime._top_level(importtime._run("pass")[1]))
+
+
+@pytest.mark.parametrize("page", importtime.PAGES, ids=lambda p: p.name)
+def test_page_imports_within_budget(page, startup):
+    seconds, offenders = importtime.measure(page, 3, startup)
+    assert seconds * 1000 < importtime.DEFAULT_BUDGET_MS, f"{page.name}: {offenders}"
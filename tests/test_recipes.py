@@ -0,0 +1,92 @@
+# tests/test_recipes.py — recipe composition and recipe swaps
+import pandas as pd
+import pytest
+
+import recipes
+from catalog import NUTRIENT_COLS
+
+RECIPE_FOODS = [
+    # fdc_id, Food, Category, kcal, protein, carbs, fat, fiber, sugar
+    (1, "Rice, cooked", "Cereal Grains and Pasta", 130, 2.7, 28, 0.3, 0.4, 0.1),
+    (2, "Chicken breast, roasted", "Poultry Products", 165, 31, 0, 3.6, 0, 0),
+    (3, "Cheddar cheese", "Dairy and Egg Products", 400, 25, 1.3, 33, 0, 0.5),
+    (4, "Spinach, raw", "Vegetables and Vegetable Products", 23, 2.9, 3.6, 0.4, 2.2, 0.4),
+]
+
+
+@pytest.fixture
+def foods():
+    return pd.DataFrame(RECIPE_FOODS, columns=["fdc_id", "Food", "Category"] + NUTRIENT_COLS).set_index("fdc_id")
+
+
+@pytest.fixture
+def recipe_store(make_store):
+    recipes._composition.clear()
+    return make_store(RECIPE_FOODS, name="recipes")
+
+
+# -----------------------------------------------------
+# COMPOSITION
+# -----------------------------------------------------
+def test_normalise_merges_and_sorts():
+    assert recipes.normalise([(2, 50), ("1", 100.0), (2, 25), (4, 0)]) == ((1, 100.0), (2, 75.0))
+
+
+def test_compose_weights_by_grams(foods):
+    comp = recipes.compose(foods, ((1, 300.0), (2, 100.0)))
+    assert comp["grams"] == 400
+    assert comp["nutrients"]["Calories (kcal)"] == pytest.approx((130 * 300 + 165 * 100) / 400)
+    assert comp["nutrients"]["Protein (g)"] == pytest.approx((2.7 * 300 + 31 * 100) / 400)
+    assert comp["foods"] == ["Rice, cooked", "Chicken breast, roasted"]
+    assert comp["missing"] == []
+
+
+def test_compose_leaves_out_missing_ingredients(foods):
+    comp = recipes.compose(foods, ((1, 100.0), (99, 500.0)))
+    assert comp["missing"] == [99]
+    assert comp["grams"] == 100
+    assert comp["nutrients"]["Calories (kcal)"] == pytest.approx(130)
+
+
+def test_compose_with_nothing_left(foods):
+    comp = recipes.compose(foods, ((98, 100.0), (99, 50.0)))
+    assert comp["missing"] == [98, 99]
+    assert comp["grams"] == 0
+    assert all(pd.isna(v) for v in comp["nutrients"].values())
+    assert all(comp["diets"].values())
+
+
+@pytest.mark.parametrize("ingredients, diets", [
+    (((1, 100.0), (4, 50.0)), {"Non-Vegetarian": True, "Vegetarian": True, "Vegan": True}),
+    (((1, 100.0), (3, 30.0)), {"Non-Vegetarian": True, "Vegetarian": True, "Vegan": False}),
+    (((1, 100.0), (2, 100.0)), {"Non-Vegetarian": True, "Vegetarian": False, "Vegan": False}),
+])
+def test_compose_diet_flags_follow_the_strictest_ingredient(foods, ingredients, diets):
+    assert recipes.compose(foods, ingredients)["diets"] == diets
+
+
+# -----------------------------------------------------
+# RECIPE SWAPS
+# -----------------------------------------------------
+MY_RECIPES = {
+    "bowl": {"name": "Rice bowl", "ingredients": [(1, 200), (4, 100)]},
+    "salad": {"name": "Green salad", "ingredients": [(4, 200)]},
+    "cheesy": {"name": "Cheesy rice", "ingredients": [(1, 100), (3, 100)]},
+}
+
+
+def test_recipe_rows_filter_by_diet_and_term(recipe_store):
+    assert set(recipes.recipe_rows(recipe_store, MY_RECIPES, diet="Vegan").index) == {"bowl", "salad"}
+    # ingredient names are searched as well as the recipe name
+    assert list(recipes.recipe_rows(recipe_store, MY_RECIPES, term="cheddar").index) == ["cheesy"]
+
+
+def test_recipe_swaps_apply_the_catalog_rule(recipe_store):
+    swaps = recipes.recipe_swaps(recipe_store, MY_RECIPES, max_kcal=100, min_protein=2.0)
+    assert list(swaps.index) == ["salad", "bowl"]
+    assert (swaps["Calories (kcal)"] <= 100).all()
+
+
+def test_recipe_swaps_exclude_the_recipe_itself(recipe_store):
+    swaps = recipes.recipe_swaps(recipe_store, MY_RECIPES, max_kcal=100, min_protein=2.0, exclude="salad")
+    assert list(swaps.index) == ["bowl"]
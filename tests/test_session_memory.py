@@ -0,0 +1,119 @@
+# tests/test_session_memory.py — chat compaction and the idle evict/restore round trip
+import os
+
+import pytest
+
+import session_memory as sm
+
+
+def chat(n):
+    """Greeting plus n user/assistant message pairs"""
+    history = [("Assistant", "Hi!")]
+    for i in range(n):
+        history += [("You", f"question {i}"), ("Assistant", f"answer {i}")]
+    return history
+
+
+# -----------------------------------------------------
+# CHAT COMPACTION
+# -----------------------------------------------------
+def test_short_chat_is_untouched():
+    history = chat(3)
+    assert sm.compact_chat(history, max_turns=6) is history
+
+
+def test_old_turns_fold_into_one_summary():
+    out = sm.compact_chat(chat(5), max_turns=4)
+    assert out[0] == ("Assistant", "Hi!")
+    assert out[1] == ("Summary", sm.SUMMARY_PREFIX + "question 0; question 1; question 2")
+    assert out[2:] == chat(5)[-4:]
+
+
+def test_repeated_compaction_keeps_a_single_prefix():
+    history = sm.compact_chat(chat(5), max_turns=4)
+    history += [("You", "question 5"), ("Assistant", "answer 5")]
+    history = sm.compact_chat(history, max_turns=4)
+
+    summary = history[1][1]
+    assert summary.count(sm.SUMMARY_PREFIX) == 1
+    assert summary == sm.SUMMARY_PREFIX + "question 0; question 1; question 2; question 3"
+    assert len(history) == 2 + 4
+
+
+def test_summary_is_capped_and_keeps_the_newest_topics():
+    history = chat(200)
+    for _ in range(3):
+        history = sm.compact_chat(history, max_turns=2)
+    summary = history[1][1]
+    assert summary.startswith(sm.SUMMARY_PREFIX)
+    assert len(summary) <= sm.SUMMARY_MAX_CHARS
+    assert summary.endswith("question 198")
+
+
+def test_long_questions_are_truncated():
+    history = [("Assistant", "Hi!"), ("You", "x" * 200), ("Assistant", "ok"), ("You", "y"), ("Assistant", "ok")]
+    summary = sm.compact_chat(history, max_turns=2)[1][1]
+    assert summary == sm.SUMMARY_PREFIX + "x" * 77 + "…"
+
+
+# -----------------------------------------------------
+# IDLE EVICTION
+# -----------------------------------------------------
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(sm, "EVICT_DIR", str(tmp_path))
+    monkeypatch.setattr(sm, "_sessions", {})
+    connected = set()
+    monkeypatch.setattr(sm, "_is_connected", lambda session_id: session_id in connected)
+    return connected
+
+
+def add_session(session_id, state, last_seen):
+    sm._sessions[session_id] = [last_seen, state, sm.threading.Lock()]
+
+
+def test_idle_session_is_evicted_and_restored(sessions):
+    state = {"cart": [{"fdc_id": 1, "Meal": "Lunch", "Grams": 100.0}], "recipes": {}, "user": {"id": 7}}
+    original = {k: v for k, v in state.items()}
+    sessions.add("s1")
+    add_session("s1", state, last_seen=0)
+
+    sm.sweep(now=sm.SESSION_IDLE_SECONDS + 1)
+    assert state == {"user": {"id": 7}}
+    assert os.path.exists(sm._evict_path("s1"))
+
+    sm._restore("s1", state)
+    assert state == original
+    assert not os.path.exists(sm._evict_path("s1"))
+
+
+def test_active_session_is_kept(sessions):
+    state = {"cart": [1, 2, 3]}
+    sessions.add("s1")
+    add_session("s1", state, last_seen=100)
+
+    sm.sweep(now=100 + sm.SESSION_IDLE_SECONDS)
+    assert state == {"cart": [1, 2, 3]}
+    assert not os.path.exists(sm._evict_path("s1"))
+
+
+def test_restore_keeps_values_set_since_eviction(sessions):
+    state = {"cart": ["old"]}
+    sessions.add("s1")
+    add_session("s1", state, last_seen=0)
+    sm.sweep(now=sm.SESSION_IDLE_SECONDS + 1)
+
+    state["cart"] = ["new"]
+    sm._restore("s1", state)
+    assert state["cart"] == ["new"]
+
+
+def test_disconnected_session_is_forgotten(sessions):
+    state = {"cart": [1]}
+    add_session("gone", state, last_seen=0)
+    sm._evict("gone", state)
+    assert os.path.exists(sm._evict_path("gone"))
+
+    sm.sweep(now=sm.SESSION_IDLE_SECONDS + 1)
+    assert "gone" not in sm._sessions
+    assert not os.path.exists(sm._evict_path("gone"))
@@ -0,0 +1,92 @@
+# tests/test_similarity.py — FoodIndex.similar (tree and brute-force paths) against a full scan
+import numpy as np
+import pytest
+
+import similarity
+from catalog import NUTRIENT_COLS
+from similarity import BRUTE_FORCE_MAX, build_index
+
+CATEGORIES = ["Beans", "Poultry Products", "Vegetables"]
+N_FOODS = 3 * BRUTE_FORCE_MAX
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rng = np.random.default_rng(11)
+    out = []
+    for i in range(N_FOODS):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        name = f"Chicken dish {i}" if i % 7 == 0 else f"Food {i}"
+        out.append((i + 1, name, category, *rng.gamma(2.0, 20.0, size=len(NUTRIENT_COLS))))
+    # a same-name duplicate of food 2 with an identical profile
+    out.append((N_FOODS + 1, out[1][1], out[1][2], *out[1][3:]))
+    return out
+
+
+@pytest.fixture
+def index(make_store, rows):
+    return build_index(make_store(rows, name="similar"))
+
+
+def brute_force(index, fdc_id, k, diet=None, categories=None):
+    """Every allowed food, ranked by distance — the answer `similar` must reproduce"""
+    pos = index.position(fdc_id)
+    mask = index.allowed(diet, categories) & (index.name_hash != index.name_hash[pos])
+    cand = np.flatnonzero(mask)
+    dist = np.linalg.norm(index.vectors[cand] - index.vectors[pos], axis=1)
+    order = np.argsort(dist)[:k]
+    return index.ids[cand[order]], dist[order]
+
+
+@pytest.mark.parametrize("diet, categories", [
+    (None, None),
+    ("Vegetarian", None),
+    (None, ["Beans", "Vegetables"]),
+    ("Vegan", ["Beans", "Poultry Products"]),
+])
+def test_tree_path_matches_brute_force(index, diet, categories):
+    assert index.allowed(diet, categories).sum() > BRUTE_FORCE_MAX
+    for fdc_id in [1, 2, 500, N_FOODS]:
+        positions, dist = index.similar(fdc_id, 10, diet=diet, categories=categories)
+        ids, expected = brute_force(index, fdc_id, 10, diet, categories)
+        assert index.ids[positions].tolist() == ids.tolist()
+        assert dist == pytest.approx(expected, rel=1e-5)
+
+
+def test_brute_force_path_matches_a_full_scan(index, monkeypatch):
+    # a mask small enough for the direct scan
+    categories = ["Poultry Products"]
+    assert index.allowed("Vegetarian", categories).sum() <= BRUTE_FORCE_MAX
+    positions, dist = index.similar(3, 10, diet="Vegetarian", categories=categories)
+    ids, expected = brute_force(index, 3, 10, "Vegetarian", categories)
+    assert index.ids[positions].tolist() == ids.tolist()
+    assert dist == pytest.approx(expected, rel=1e-5)
+
+    # the tree path gives the same answer for the same mask
+    monkeypatch.setattr(similarity, "BRUTE_FORCE_MAX", 0)
+    positions_tree, _ = index.similar(3, 10, diet="Vegetarian", categories=categories)
+    assert positions_tree.tolist() == positions.tolist()
+
+
+def test_results_respect_the_masks(index):
+    positions, _ = index.similar(5, 50, diet="Vegetarian", categories=["Beans"])
+    assert len(positions) == 50
+    assert index.diets["Vegetarian"][positions].all()
+    assert {index.categories[c] for c in index.category_codes[positions]} == {"Beans"}
+
+
+def test_never_suggests_the_food_or_a_same_name_duplicate(index):
+    positions, _ = index.similar(2, 20)
+    ids = index.ids[positions].tolist()
+    assert 2 not in ids
+    assert N_FOODS + 1 not in ids
+
+
+def test_empty_mask_returns_nothing(index):
+    positions, _ = index.similar(1, 10, categories=["Nowhere"])
+    assert len(positions) == 0
+
+
+def test_unknown_food_is_a_key_error(index):
+    with pytest.raises(KeyError):
+        index.similar(10 ** 9)
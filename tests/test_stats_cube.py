@@ -0,0 +1,79 @@
+# tests/test_stats_cube.py — StatsCube against pandas on a small synthetic catalog
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import NUTRIENT_COLS
+from stats_cube import N_BINS, QUANTILES, build_cube
+
+CATEGORIES = ["Fruits", "Grains", "Meats"]
+
+
+@pytest.fixture(scope="module")
+def foods():
+    rng = np.random.default_rng(7)
+    rows = []
+    for c, category in enumerate(CATEGORIES):
+        for i in range(400):
+            kcal = rng.gamma(2.0 + c, 60.0)
+            rows.append((len(rows) + 1, f"{category} {i}", category, kcal,
+                         *rng.gamma(2.0, 3.0 + c, size=len(NUTRIENT_COLS) - 1)))
+    # a few far-out values above the 99th percentile, all in one category
+    for i in range(5):
+        rows.append((len(rows) + 1, f"Outlier {i}", "Meats", 5000.0 + i, 90, 90, 90, 90, 90))
+    # zero calories: no protein density
+    rows.append((len(rows) + 1, "Water", "Fruits", 0.0, 0, 0, 0, 0, 0))
+    return pd.DataFrame(rows, columns=["fdc_id", "Food", "Category"] + NUTRIENT_COLS)
+
+
+@pytest.fixture
+def cube(make_store, foods):
+    return build_cube(make_store(foods.itertuples(index=False), name="cube"))
+
+
+def test_counts_and_means_match_pandas(cube, foods):
+    grouped = foods.groupby("Category")["Calories (kcal)"]
+    summary = cube.summary("Calories (kcal)").set_index("Category")
+    pd.testing.assert_series_equal(summary["Count"], grouped.count(), check_names=False, check_dtype=False)
+    pd.testing.assert_series_equal(summary["Mean"], grouped.mean(), check_names=False)
+
+
+def test_single_category_quantiles_are_exact(cube, foods):
+    protein = foods.loc[foods["Category"] == "Grains", "Protein (g)"]
+    got = cube.merged("Protein (g)", ["Grains"])["quantiles"]
+    assert list(got.values()) == pytest.approx(protein.quantile(QUANTILES).tolist())
+
+
+def test_merged_quantiles_interpolate_the_histogram(cube, foods):
+    kcal = foods.loc[foods["Category"].isin(["Fruits", "Grains"]), "Calories (kcal)"]
+    merged = cube.merged("Calories (kcal)", ["Fruits", "Grains"])
+    width = cube.edges[cube.measures.index("Calories (kcal)")][1]
+
+    assert merged["count"] == len(kcal)
+    assert merged["mean"] == pytest.approx(kcal.mean())
+    # within one bin of the exact answer
+    exact = kcal.quantile(QUANTILES).to_numpy()
+    assert np.abs(np.array(list(merged["quantiles"].values())) - exact).max() <= width
+
+
+def test_histogram_clamps_the_tail_into_the_top_bin(cube, foods):
+    m = cube.measures.index("Calories (kcal)")
+    merged = cube.merged("Calories (kcal)")
+    hi = cube.edges[m][-1]
+
+    assert hi == pytest.approx(foods["Calories (kcal)"].quantile(0.99))
+    assert merged["hist"]["Count"].sum() == len(foods)
+    assert merged["hist"]["Count"].iloc[-1] == (foods["Calories (kcal)"] >= hi - hi / N_BINS).sum()
+    assert cube.hist[CATEGORIES.index("Meats"), m, N_BINS - 1] >= 5
+
+
+def test_derived_measure_skips_zero_calories(cube, foods):
+    density = 100 * foods["Protein (g)"] / foods["Calories (kcal)"].replace(0, np.nan)
+    merged = cube.merged("Protein density (g/100 kcal)")
+    assert merged["count"] == density.notna().sum()
+    assert merged["mean"] == pytest.approx(density.mean())
+
+
+def test_unknown_categories_are_ignored(cube):
+    merged = cube.merged("Fat (g)", ["Meats", "Sweets"])
+    assert merged["count"] == cube.merged("Fat (g)", ["Meats"])["count"]
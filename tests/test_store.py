@@ -0,0 +1,36 @@
+# tests/test_store.py — catalog sources the store refuses to build
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import store as store_mod
+
+
+@pytest.fixture
+def legacy_csv(tmp_path, monkeypatch):
+    """A catalog export from before foods were keyed on fdc_id"""
+    monkeypatch.setattr(store_mod, "CATALOG_DIR", str(tmp_path / "store"))
+    path = tmp_path / "legacy.csv"
+    pd.DataFrame({"Food": ["Apple, raw"], "Category": ["Fruits"], "Calories (kcal)": [52]}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_source_without_fdc_id_is_rejected(legacy_csv):
+    with pytest.raises(ValueError, match="fdc_id"):
+        store_mod.open_store(legacy_csv, None)
+
+
+def page(source):
+    import streamlit as st
+    from store import get_store
+
+    get_store(source, None)
+    st.write("unreachable")
+
+
+def test_page_shows_an_error_instead_of_a_traceback(legacy_csv):
+    at = AppTest.from_function(page, args=(legacy_csv,)).run()
+    assert not at.exception
+    assert "fdc_id" in at.error[0].value
+    assert "usda.ipynb" in at.info[0].value
+    assert not at.markdown